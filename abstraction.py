@@ -0,0 +1,280 @@
+import argparse
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lookup import cards_to_indexes, evaluate_with_board, save_array
+
+STREET_CARDS = {"flop": 3, "turn": 4, "river": 5}
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "abstraction")
+# Runouts simulated per features_for call; each costs about 2 KB at its peak.
+CHUNK_ROWS = 65536
+
+# BINOMIAL[n, k] = n choose k, for colex-ranking sorted card sets.
+BINOMIAL = np.zeros((53, 6), dtype=np.int64)
+BINOMIAL[:, 0] = 1
+for _n in range(1, 53):
+    BINOMIAL[_n, 1:] = BINOMIAL[_n - 1, 1:] + BINOMIAL[_n - 1, :-1]
+SUIT_PERMUTATIONS = np.array(list(itertools.permutations(range(4))), dtype=np.int8)
+
+_loaded = {}
+_combinations = {}
+
+
+def colex_index(cards):
+    """Rank each row of an (n, k) array of distinct 0-51 card indexes among all k-card sets."""
+    cards = np.sort(np.asarray(cards, dtype=np.intp), axis=-1)
+    return BINOMIAL[cards, np.arange(1, cards.shape[-1] + 1)].sum(axis=-1)
+
+
+def canonical_keys(hole, board):
+    """
+    Situation key that is identical for every suit relabelling of (hole, board).
+
+    The key is the smallest hole_rank * C(52, k) + board_rank over the 24 suit
+    permutations, so it also tells how many distinct raw situations share it.
+
+    :return: (keys, multiplicity) arrays.
+    """
+    hole = np.asarray(hole, dtype=np.intp)
+    board = np.asarray(board, dtype=np.intp)
+    ranks_hole, suits_hole = hole // 4, hole % 4
+    ranks_board, suits_board = board // 4, board % 4
+    size = BINOMIAL[52, board.shape[1]]
+    keys = np.stack([colex_index(ranks_hole * 4 + perm[suits_hole]) * size
+                     + colex_index(ranks_board * 4 + perm[suits_board]) for perm in SUIT_PERMUTATIONS])
+    ordered = np.sort(keys, axis=0)
+    multiplicity = 1 + (np.diff(ordered, axis=0) != 0).sum(axis=0)
+    return ordered[0], multiplicity
+
+
+# All 1326 hole-card pairs in colex order, so HOLES[colex_index(hole)] == hole.
+HOLES = np.array([(low, high) for high in range(52) for low in range(high)], dtype=np.int8)
+
+
+def canonical_holes():
+    """Colex ranks of the 169 hole-card pairs that represent their suit class."""
+    holes = HOLES.astype(np.intp)
+    keys = np.stack([colex_index(holes // 4 * 4 + perm[holes % 4]) for perm in SUIT_PERMUTATIONS])
+    return np.unique(keys.min(axis=0))
+
+
+HOLE_SLOT = np.full(1326, -1, dtype=np.int16)
+HOLE_SLOT[canonical_holes()] = np.arange(169)
+
+
+def hand_strength_features(hole, board, num_runouts, num_samples, bins, rng):
+    """
+    Sample the river equity distribution of each (hole, board) situation.
+
+    Every situation is run out num_runouts times; on each river its equity
+    against num_samples random opponent hands (ties count half) falls into
+    one of bins histogram bins.
+
+    :return: (histograms (n, bins), expected hand strength (n,)).
+    """
+    n, k = board.shape
+    missing = 5 - k
+    runouts = 1 if missing == 0 else num_runouts
+    rows = n * runouts
+    dead = np.concatenate([hole, board], axis=1).astype(np.intp)
+
+    # Put each row's dead cards at the back of a random permutation: the
+    # first cards complete the board and the rest are dealt to opponents.
+    keys = rng.random((rows, 52))
+    keys[np.repeat(np.arange(rows), 2 + k), np.repeat(dead, runouts, axis=0).ravel()] = 2.0
+    deck = np.argsort(keys, axis=1)
+    boards = np.concatenate([np.repeat(board, runouts, axis=0), deck[:, :missing]], axis=1)
+    remaining = 52 - 2 - 5
+    first = rng.integers(0, remaining, size=(rows, num_samples))
+    second = rng.integers(0, remaining - 1, size=(rows, num_samples))
+    second += second >= first
+    opponents = np.stack([np.take_along_axis(deck, missing + first, axis=1),
+                          np.take_along_axis(deck, missing + second, axis=1)], axis=2)
+    hands = np.concatenate([np.repeat(hole, runouts, axis=0)[:, None, :], opponents], axis=1)
+
+    scores = evaluate_with_board(boards, hands)
+    hero, rest = scores[:, :1], scores[:, 1:]
+    equity = ((hero < rest) + 0.5 * (hero == rest)).mean(axis=1).reshape(n, runouts)
+    bin_index = np.minimum((equity * bins).astype(np.intp), bins - 1)
+    histograms = np.zeros((n, bins))
+    np.add.at(histograms, (np.repeat(np.arange(n), runouts), bin_index.ravel()), 1.0 / runouts)
+    return histograms, equity.mean(axis=1)
+
+
+def kmeans(points, num_clusters, iterations=50, seed=0):
+    """Lloyd's k-means with k-means++ seeding, returning (centroids, labels)."""
+    rng = np.random.default_rng(seed)
+    centroids = [points[rng.integers(len(points))]]
+    distances = ((points - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, num_clusters):
+        total = distances.sum()
+        index = rng.choice(len(points), p=distances / total) if total > 0 else rng.integers(len(points))
+        centroids.append(points[index])
+        distances = np.minimum(distances, ((points - points[index]) ** 2).sum(axis=1))
+    centroids = np.array(centroids)
+
+    for _ in range(iterations):
+        labels = nearest(points, centroids)
+        moved = centroids.copy()
+        for cluster in range(num_clusters):
+            members = points[labels == cluster]
+            if len(members):
+                moved[cluster] = members.mean(axis=0)
+        if np.allclose(moved, centroids):
+            break
+        centroids = moved
+    return centroids, nearest(points, centroids)
+
+
+def nearest(points, centroids):
+    distances = (points ** 2).sum(axis=1)[:, None] - 2 * points @ centroids.T + (centroids ** 2).sum(axis=1)
+    return distances.argmin(axis=1)
+
+
+def features_for(hole, board, num_runouts, num_samples, bins, rng):
+    """Clustering features: the cumulative histogram, so squared distance tracks earth mover's distance."""
+    histograms, strength = hand_strength_features(hole, board, num_runouts, num_samples, bins, rng)
+    return np.cumsum(histograms, axis=1)[:, :-1], strength
+
+
+def chunk_size_for(street, num_runouts, chunk_rows=CHUNK_ROWS):
+    """Situations per features_for call so that each call simulates about chunk_rows runouts."""
+    runouts = num_runouts if STREET_CARDS[street] < 5 else 1
+    return max(1, chunk_rows // max(1, runouts))
+
+
+def fit_buckets(street, num_buckets, fit_size=200000, num_runouts=32, num_samples=16, bins=10, seed=0):
+    """
+    Cluster randomly dealt situations of a street into buckets.
+
+    Random deals weight every canonical situation by how often it occurs.
+    Buckets are numbered from weakest to strongest expected hand strength.
+    Deals are drawn and featurised chunk by chunk, so memory stays flat
+    whatever fit_size is.
+
+    :return: (centroids, bucket_strength).
+    """
+    rng = np.random.default_rng([seed, STREET_CARDS[street]])
+    points = np.empty((fit_size, bins - 1))
+    strength = np.empty(fit_size)
+    chunk_size = chunk_size_for(street, num_runouts)
+    for start in range(0, fit_size, chunk_size):
+        size = min(chunk_size, fit_size - start)
+        deals = np.argsort(rng.random((size, 52)), axis=1)[:, :2 + STREET_CARDS[street]]
+        points[start:start + size], strength[start:start + size] = features_for(
+            deals[:, :2], deals[:, 2:], num_runouts, num_samples, bins, rng)
+    centroids, labels = kmeans(points, num_buckets, seed=seed)
+    bucket_strength = np.array([strength[labels == cluster].mean() if (labels == cluster).any() else 0.0
+                                for cluster in range(num_buckets)])
+    order = np.argsort(bucket_strength)
+    return centroids[order], bucket_strength[order]
+
+
+def _boards(k):
+    if k not in _combinations:
+        _combinations[k] = np.array(list(itertools.combinations(range(52), k)), dtype=np.int8)
+    return _combinations[k]
+
+
+def _assign_hole(street, hole_rank, centroids, num_runouts, num_samples, bins, seed):
+    """Bucket every canonical board for one canonical hole, returning (board ranks, buckets)."""
+    k = STREET_CARDS[street]
+    hole = HOLES[hole_rank].astype(np.intp)
+    boards = _boards(k)
+    boards = boards[~np.isin(boards, hole).any(axis=1)].astype(np.intp)
+    holes = np.broadcast_to(hole, (len(boards), 2))
+    keys, _ = canonical_keys(holes, boards)
+    board_ranks = colex_index(boards)
+    canonical = keys == hole_rank * BINOMIAL[52, k] + board_ranks
+    boards, board_ranks = boards[canonical], board_ranks[canonical]
+
+    rng = np.random.default_rng([seed, k, int(hole_rank)])
+    buckets = np.empty(len(boards), dtype=np.int64)
+    chunk_size = chunk_size_for(street, num_runouts)
+    for start in range(0, len(boards), chunk_size):
+        chunk = boards[start:start + chunk_size]
+        points, _ = features_for(np.broadcast_to(hole, (len(chunk), 2)), chunk, num_runouts, num_samples, bins, rng)
+        buckets[start:start + chunk_size] = nearest(points, centroids)
+    return int(hole_rank), board_ranks, buckets
+
+
+def build_index(street, num_buckets=50, directory=DEFAULT_DIR, fit_size=200000, num_runouts=32, num_samples=16,
+                bins=10, seed=0, workers=None):
+    """
+    Bucket every canonical situation of a street and write the index to directory.
+
+    <street>_buckets.npy holds one bucket per (canonical hole, board) slot,
+    so a lookup is a single array read; <street>_centroids.npy and
+    <street>_strength.npy describe the buckets.
+    """
+    k = STREET_CARDS[street]
+    centroids, bucket_strength = fit_buckets(street, num_buckets, fit_size, num_runouts, num_samples, bins, seed)
+    os.makedirs(directory, exist_ok=True)
+    dtype = np.uint8 if num_buckets <= 256 else np.uint16
+    path = os.path.join(directory, f"{street}_buckets.npy")
+    index = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=dtype, shape=(169, int(BINOMIAL[52, k])))
+
+    arguments = (centroids, num_runouts, num_samples, bins, seed)
+    holes = np.flatnonzero(HOLE_SLOT >= 0)
+    if workers:
+        with ProcessPoolExecutor(workers) as pool:
+            results = pool.map(_assign_hole, [street] * len(holes), holes, *[[argument] * len(holes) for argument in arguments])
+            for hole_rank, board_ranks, buckets in results:
+                index[HOLE_SLOT[hole_rank], board_ranks] = buckets
+    else:
+        for hole_rank in holes:
+            _, board_ranks, buckets = _assign_hole(street, hole_rank, *arguments)
+            index[HOLE_SLOT[hole_rank], board_ranks] = buckets
+    index.flush()
+    del index
+    os.replace(path + ".tmp", path)
+    save_array(os.path.join(directory, f"{street}_centroids.npy"), centroids)
+    save_array(os.path.join(directory, f"{street}_strength.npy"), bucket_strength)
+    return path
+
+
+def load_index(street, directory=DEFAULT_DIR):
+    """Memory-map the bucket index of a street, or return None when it has not been built."""
+    path = os.path.join(directory, f"{street}_buckets.npy")
+    if path not in _loaded:
+        if not os.path.exists(path):
+            return None
+        _loaded[path] = np.load(path, mmap_mode="r")
+    return _loaded[path]
+
+
+def lookup(index, hole_cards, community_cards):
+    """Return the bucket of a situation given as treys cards, or None when there is no index."""
+    if index is None:
+        return None
+    hole = cards_to_indexes(hole_cards)[None, :]
+    board = cards_to_indexes(community_cards)[None, :]
+    keys, _ = canonical_keys(hole, board)
+    hole_rank, board_rank = divmod(int(keys[0]), int(BINOMIAL[52, board.shape[1]]))
+    return int(index[HOLE_SLOT[hole_rank], board_rank])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute hand-strength buckets for post-flop situations.")
+    parser.add_argument("--streets", default="flop,turn", help="Comma-separated subset of " + ", ".join(STREET_CARDS) + ".")
+    parser.add_argument("--buckets", type=int, default=50)
+    parser.add_argument("--fit-size", type=int, default=200000, help="Random situations used to fit the clusters.")
+    parser.add_argument("--runouts", type=int, default=32, help="Sampled board runouts per situation.")
+    parser.add_argument("--samples", type=int, default=16, help="Sampled opponent hands per runout.")
+    parser.add_argument("--bins", type=int, default=10, help="Equity histogram bins.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", default=DEFAULT_DIR)
+    args = parser.parse_args()
+
+    for street in args.streets.split(","):
+        path = build_index(street, args.buckets, args.output, args.fit_size, args.runouts, args.samples,
+                           args.bins, args.seed, args.workers)
+        print(f"Wrote {args.buckets} {street} buckets to {path}")
+
+
+if __name__ == "__main__":
+    main()
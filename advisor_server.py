@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from treys import Card
+
+from poker import PokerSimulator
+from poker_main import PokerGame, bet_fraction, pot_odds_for
+
+_simulator = None
+
+
+def _init_worker():
+    global _simulator
+    _simulator = PokerSimulator()
+
+
+def compute_advice(hole_cards, community_cards, num_opponents, pot, bet_to_call, balance, num_simulations):
+    """Equity and bet recommendation for one table state; runs in a pool worker."""
+    start = time.perf_counter()
+    if community_cards:
+        equity = _simulator.simulate_winning_probability(hole_cards, community_cards, num_opponents, num_simulations)
+    else:
+        equity = _simulator.evaluate_preflop_hand_strength(hole_cards, num_simulations, num_opponents)
+    pot_odds = pot_odds_for(pot, bet_to_call)
+    fraction = bet_fraction(equity, pot_odds)
+    return {"equity": equity, "pot_odds": pot_odds, "bet_fraction": fraction, "bet": balance * fraction,
+            "compute_seconds": time.perf_counter() - start}
+
+
+class TableSession():
+    """One hosted PokerGame plus the connections following it and its latency history."""
+
+    def __init__(self, table_id, starting_balance, players, main_player):
+        self.table_id = table_id
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.game = PokerGame(starting_balance)
+            for name in players:
+                self.game.add_player(name)
+        self.game.main_player = self.game.find_player(main_player)
+        if self.game.main_player is None:
+            raise ValueError(f"Main player {main_player} is not seated at table {table_id}.")
+        self.game.num_players = len(players)
+        self.subscribers = set()
+        self.latencies = deque(maxlen=1000)
+        self.advice_count = 0
+        self.sequence = 0  # Numbers the ops applied to this table; advice carries the number of its op
+
+    def parse_cards(self, cards):
+        """Convert card strings such as "Ks", raising ValueError on anything else."""
+        parsed = []
+        for card in cards:
+            if not isinstance(card, str) or len(card) != 2:
+                raise ValueError(f"Invalid card {card!r}; expected a rank and a suit such as 'Ks'.")
+            with contextlib.redirect_stdout(io.StringIO()):
+                parsed.append(self.game.convert_to_card(card))
+        return parsed
+
+    def set_cards(self, hole=None, board=None):
+        if hole is not None:
+            self.game.hole_cards = self.parse_cards(hole)
+        if board is not None:
+            self.game.community_cards = self.parse_cards(board)
+            self.game.round = {0: 0, 3: 1, 4: 2, 5: 3}.get(len(board), self.game.round)
+
+    def new_hand(self):
+        """Clear bets, folds, the pot and the cards, keeping every player's balance."""
+        game = self.game
+        game.players.extend(game.folded_players)
+        game.folded_players = []
+        for player in game.players:
+            player.reset_bet()
+        game.pot_total = 0
+        game.highest_bet = 0
+        game.round = 0
+        game.hole_cards = []
+        game.community_cards = []
+        game.equity_session = None
+
+    def apply_action(self, player_name, action, amount=0):
+        """Apply a betting action through PokerGame, returning whatever it printed."""
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            player = self.game.find_player(player_name)
+            if player is None:
+                raise ValueError(f"Player {player_name} not found.")
+            if action == "fold":
+                player.fold()
+            elif action == "call":
+                amount = self.game.highest_bet - player.current_bet
+                if amount > 0 and self.game.place_bet(player_name, amount):
+                    self.game.pot_total += amount
+            elif action in ("bet", "raise"):
+                if self.game.place_bet(player_name, amount):
+                    self.game.pot_total += amount
+            elif action != "check":
+                raise ValueError(f"Unknown action {action}.")
+        return output.getvalue().strip()
+
+    def advice_arguments(self, num_simulations):
+        """Snapshot of the table state compute_advice needs, unaffected by later ops."""
+        game = self.game
+        active = [player for player in game.players if not player.folded]
+        return (list(game.hole_cards), list(game.community_cards), max(1, len(active) - 1), game.pot_total,
+                max(0, game.highest_bet - game.main_player.current_bet), game.main_player.balance, num_simulations)
+
+    def metrics(self):
+        latencies = list(self.latencies)
+        result = {"advice_count": self.advice_count}
+        if latencies:
+            result.update(latency_p50=float(np.percentile(latencies, 50)),
+                          latency_p99=float(np.percentile(latencies, 99)),
+                          latency_max=max(latencies))
+        return result
+
+
+class AdvisorServer():
+    """
+    Serve many independent tables over newline-delimited JSON.
+
+    Simulations run in a shared process pool, so a slow spot on one table
+    never blocks the event loop or the other tables. At most max_pending
+    computations are queued; beyond that the server stops reading
+    requests until a worker frees up.
+    """
+
+    def __init__(self, workers=None, max_pending=None, num_simulations=100000):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+        self.max_pending = max_pending or 4 * self.workers
+        self.slots = asyncio.Semaphore(self.max_pending)
+        self.in_flight = 0
+        self.num_simulations = num_simulations
+        self.sessions = {}
+        self.tasks = set()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self.dispatch(json.loads(line), writer)
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {"type": "error", "error": f"{type(e).__name__}: {e}"}
+                await self.send(writer, reply)
+        finally:
+            for session in self.sessions.values():
+                session.subscribers.discard(writer)
+            writer.close()
+
+    async def send(self, writer, message):
+        writer.write((json.dumps(message) + "\n").encode())
+        await writer.drain()
+
+    async def dispatch(self, message, writer):
+        op = message["op"]
+        if op == "metrics":
+            return {"type": "metrics", "in_flight": self.in_flight, "max_pending": self.max_pending,
+                    "tables": {table_id: session.metrics() for table_id, session in self.sessions.items()}}
+
+        table_id = message["table"]
+        if op == "open":
+            session = TableSession(table_id, message.get("starting_balance", 1000), message["players"], message["main_player"])
+            session.subscribers.add(writer)
+            self.sessions[table_id] = session
+            return {"type": "opened", "table": table_id}
+
+        session = self.sessions[table_id]
+        if op == "close":
+            del self.sessions[table_id]
+            return {"type": "closed", "table": table_id}
+        if op == "watch":
+            session.subscribers.add(writer)
+            return {"type": "watching", "table": table_id}
+        printed = None
+        if op == "cards":
+            session.set_cards(message.get("hole"), message.get("board"))
+        elif op == "action":
+            printed = session.apply_action(message["player"], message["action"], message.get("amount", 0))
+        elif op == "new_hand":
+            session.new_hand()
+        elif op != "advise":
+            raise ValueError(f"Unknown op {op}.")
+        session.sequence += 1
+        sequence = session.sequence
+        # Taken before anything awaits, so the advice reflects the table as
+        # this op left it even when later ops are pipelined behind it.
+        arguments = session.advice_arguments(self.num_simulations) if len(session.game.hole_cards) == 2 else None
+        if printed:
+            await self.send(writer, {"type": "message", "table": table_id, "text": printed, "seq": sequence})
+
+        if arguments is not None:
+            # Waiting for a slot here is the backpressure: this connection
+            # is not read again until the pool has room.
+            await self.slots.acquire()
+            self.in_flight += 1
+            task = asyncio.get_running_loop().create_task(self.advise(session, arguments, op, sequence))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        return {"type": "ok", "table": table_id, "op": op, "seq": sequence}
+
+    async def advise(self, session, arguments, op, sequence):
+        """Compute advice for a table state snapshot and send it, tagged with the op and its seq, to the subscribers."""
+        start = time.perf_counter()
+        try:
+            advice = await asyncio.get_running_loop().run_in_executor(self.pool, compute_advice, *arguments)
+        except Exception as e:
+            advice = {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+        latency = time.perf_counter() - start
+        session.latencies.append(latency)
+        session.advice_count += 1
+        message = dict(advice, type="advice", table=session.table_id, op=op, seq=sequence, latency_seconds=latency)
+        for writer in list(session.subscribers):
+            try:
+                await self.send(writer, message)
+            except ConnectionError:
+                session.subscribers.discard(writer)
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None):
+        if path:
+            server = await asyncio.start_unix_server(self.handle_connection, path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve equity and bet advice for many tables at once.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Listen on this Unix socket path instead of TCP.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=None, help="Computations queued before requests are held back.")
+    parser.add_argument("--simulations", type=int, default=100000)
+    args = parser.parse_args()
+
+    server = AdvisorServer(args.workers, args.max_pending, args.simulations)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == "__main__":
+    main()
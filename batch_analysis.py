@@ -0,0 +1,175 @@
+import argparse
+import csv
+import itertools
+import json
+import sys
+from multiprocessing import Pool
+
+import numpy as np
+from treys import Card
+
+from poker import PokerSimulator
+from poker_main import bet_fraction, pot_odds_for
+
+OUTPUT_FIELDS = ["id", "equity", "pot_odds", "bet_fraction", "bet", "error"]
+
+_simulator = None
+_settings = None
+
+
+def parse_cards(value):
+    """Accept "AsKd", "As Kd", "As,Kd" or a list of card strings."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.replace(",", " ").split()
+        if len(value) == 1 and len(value[0]) > 2:
+            value = [value[0][i:i + 2] for i in range(0, len(value[0]), 2)]
+    return [Card.new(card) for card in value]
+
+
+def read_records(stream, fmt):
+    """
+    Yield scenario dicts one at a time from a JSONL or CSV stream.
+
+    A line or row that cannot be parsed is yielded as {"_error": message}
+    so it gets an error result instead of ending the run.
+    """
+    if fmt == "csv":
+        rows = csv.DictReader(stream)
+        while True:
+            try:
+                yield next(rows)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                yield {"_error": f"csv.Error: {e}"}
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield {"_error": f"{type(e).__name__}: {e}"}
+            continue
+        if not isinstance(record, dict):
+            record = {"_error": f"ValueError: expected a JSON object, got {type(record).__name__}"}
+        yield record
+
+
+def check_spot(hole_cards, community_cards, num_opponents):
+    """Raise ValueError for a spot that cannot be simulated."""
+    if len(hole_cards) != 2:
+        raise ValueError(f"Expected 2 hole cards, got {len(hole_cards)}.")
+    if len(community_cards) not in (0, 3, 4, 5):
+        raise ValueError(f"The board must have 0, 3, 4 or 5 cards, got {len(community_cards)}.")
+    most = (52 - 2 - 5) // 2
+    if not 1 <= num_opponents <= most:
+        raise ValueError(f"Opponents must be between 1 and {most}, got {num_opponents}.")
+
+
+def _init_worker(simulations, seed):
+    global _simulator, _settings
+    _simulator = PokerSimulator(seed=seed)
+    # Every record is reseeded from its index; a cache would hand repeated
+    # spots the first answer and make results depend on the worker count.
+    _simulator.equity_cache = None
+    _settings = (simulations, seed)
+
+
+def analyse(item):
+    """Compute equity and the bet recommendation for one (index, record) pair."""
+    index, record = item
+    simulations, seed = _settings
+    result = {"id": record.get("id", index)}
+    if "_error" in record:
+        result["error"] = record["_error"]
+        return result
+    try:
+        hole_cards = parse_cards(record["hole"])
+        community_cards = parse_cards(record.get("board"))
+        num_opponents = int(record.get("opponents", 1))
+        check_spot(hole_cards, community_cards, num_opponents)
+        pot = float(record.get("pot") or 0)
+        bet_to_call = float(record.get("to_call") or 0)
+
+        # Seed each record from its position so results do not depend on
+        # which worker picked it up.
+        if _simulator.equity_engine is not None:
+            _simulator.equity_engine.rng = np.random.default_rng([seed, index])
+        if community_cards:
+            equity = _simulator.simulate_winning_probability(hole_cards, community_cards, num_opponents, simulations)
+        else:
+            equity = _simulator.evaluate_preflop_hand_strength(hole_cards, simulations, num_opponents)
+
+        pot_odds = pot_odds_for(pot, bet_to_call)
+        fraction = bet_fraction(equity, pot_odds)
+        result.update(equity=equity, pot_odds=pot_odds, bet_fraction=fraction)
+        if record.get("balance") not in (None, ""):
+            result["bet"] = float(record["balance"]) * fraction
+    except (KeyError, ValueError, TypeError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def run(records, output, fmt="jsonl", workers=1, simulations=100000, seed=0, window=1024):
+    """
+    Analyse records and write each result as soon as its window finishes.
+
+    At most window records are held in memory at a time.
+    """
+    writer = csv.DictWriter(output, OUTPUT_FIELDS) if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+
+    items = enumerate(records)
+    pool = Pool(workers, _init_worker, (simulations, seed)) if workers > 1 else None
+    if pool is None:
+        _init_worker(simulations, seed)
+    count = 0
+    try:
+        while True:
+            chunk = list(itertools.islice(items, window))
+            if not chunk:
+                break
+            results = pool.imap(analyse, chunk, chunksize=max(1, len(chunk) // (4 * workers))) if pool else map(analyse, chunk)
+            for result in results:
+                if writer:
+                    writer.writerow(result)
+                else:
+                    output.write(json.dumps(result) + "\n")
+                count += 1
+            output.flush()
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute equity and bet recommendations for a stream of hand scenarios.")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL or CSV file of scenarios, '-' for stdin.")
+    parser.add_argument("-o", "--output", default="-", help="Where to write results, '-' for stdout.")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input and output format (default: from the file extension, else jsonl).")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--simulations", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    source = sys.stdin if args.input == "-" else open(args.input, newline="")
+    output = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    try:
+        count = run(read_records(source, fmt), output, fmt, args.workers, args.simulations, args.seed)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    print(f"Analysed {count} scenarios.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
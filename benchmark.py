@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from math import sqrt
+
+import numpy as np
+from treys import Card
+
+from equity import BatchEquityEngine
+from lookup import get_tables
+from poker import PokerSimulator
+
+# One representative spot per street.
+SPOTS = {
+    "preflop": ("As Kd", ""),
+    "flop": ("As Kd", "Qs Js 2c"),
+    "turn": ("As Kd", "Qs Js 2c 7h"),
+    "river": ("As Kd", "Qs Js 2c 7h 3d"),
+}
+
+
+# Run in a fresh interpreter so the import is cold; prints one JSON line.
+STARTUP_SCRIPT = """
+import json, sys, time, tracemalloc
+start = time.perf_counter()
+import poker_main
+imported = time.perf_counter()
+game = poker_main.PokerGame(100)
+created = time.perf_counter()
+tracemalloc.start()
+for i in range(int(sys.argv[1])):
+    game.add_player(f"player{i}")
+added = time.perf_counter()
+memory = tracemalloc.get_traced_memory()[0]
+print(json.dumps({"import_seconds": imported - start, "game_seconds": created - imported,
+                  "player_seconds": (added - created) / int(sys.argv[1]), "player_bytes": memory / int(sys.argv[1])}))
+"""
+
+# Defaults for --startup; exceeding any of them fails the run.
+STARTUP_BUDGET = {"import_seconds": 0.1, "game_seconds": 0.01, "player_seconds": 0.001, "player_bytes": 4096}
+
+
+def measure_startup(players=200):
+    """Cold import time of poker_main, PokerGame creation time, and time and traced memory per add_player."""
+    output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT, str(players)], capture_output=True, text=True,
+                            check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def over_budget(startup, budget):
+    """Return messages for every startup figure above its budget."""
+    return [f"{name}: {startup[name]:.6g} > {limit:.6g}" for name, limit in budget.items() if startup[name] > limit]
+
+
+def cards(text):
+    return [Card.new(card) for card in text.split()]
+
+
+def reference_probability(engine, hole_cards, community_cards, num_opponents, reference_trials):
+    """Exact win probability where enumeration is cheap, otherwise a large-sample estimate."""
+    if num_opponents <= 2 and community_cards:
+        return engine.exact_win_probability(hole_cards, community_cards, num_opponents), "exact"
+    wins = engine.count_wins(hole_cards, community_cards, num_opponents, reference_trials)
+    return wins / reference_trials, "sampled"
+
+
+def measure(run, repeats):
+    """
+    Time repeated calls of run(), returning per-call latencies, peak memory and the last result.
+
+    Memory is traced on a separate call so tracemalloc overhead stays out of the timings.
+    """
+    run()  # warm-up
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = run()
+        latencies.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, peak, result
+
+
+def run_suite(backend="numpy", trials=100000, repeats=15, opponents=range(1, 10), stages=SPOTS, reference_trials=2000000, seed=0):
+    """Benchmark every stage and opponent count, returning a list of result dicts."""
+    get_tables()  # keep the one-off table build out of the timings
+    reference_engine = BatchEquityEngine(seed=seed + 1)
+    simulator = PokerSimulator(backend, seed=seed)
+    simulator.equity_cache = None  # Time the simulation, not cache hits
+
+    results = []
+    for stage in stages:
+        hole_text, board_text = SPOTS[stage]
+        hole_cards, community_cards = cards(hole_text), cards(board_text)
+        for num_opponents in opponents:
+            # The public calls, as the game makes them: the pre-flop table when it is
+            # built, exact enumeration where that is cheaper than sampling.
+            if community_cards:
+                run = lambda: simulator.simulate_winning_probability(hole_cards, community_cards, num_opponents, trials)
+            else:
+                run = lambda: simulator.evaluate_preflop_hand_strength(hole_cards, trials, num_opponents)
+            latencies, peak, estimate = measure(run, repeats)
+            reference, reference_kind = reference_probability(reference_engine, hole_cards, community_cards,
+                                                              num_opponents, reference_trials)
+            standard_error = sqrt(max(reference * (1 - reference), 1e-12) / trials)
+            results.append({
+                "case": f"{stage}/{num_opponents}",
+                # Median call, so a few slow calls (GC, scheduling) do not move the gate
+                "trials_per_second": trials / float(np.median(latencies)),
+                "latency_p50": float(np.percentile(latencies, 50)),
+                "latency_p90": float(np.percentile(latencies, 90)),
+                "latency_p99": float(np.percentile(latencies, 99)),
+                "peak_memory_bytes": peak,
+                "estimate": estimate,
+                "reference": reference,
+                "reference_kind": reference_kind,
+                "abs_error": abs(estimate - reference),
+                "z_score": (estimate - reference) / standard_error,
+            })
+    return results
+
+
+def incompatible(report, baseline):
+    """Return messages for settings that make two runs' throughput incomparable."""
+    return [f"{name}: {baseline.get(name)} in the baseline, {report[name]} now"
+            for name in ("backend", "trials") if baseline.get(name) != report[name]]
+
+
+def compare(results, baseline, threshold):
+    """Return messages for every case whose throughput fell more than threshold below the baseline."""
+    previous = {entry["case"]: entry for entry in baseline["results"]}
+    regressions = []
+    for entry in results:
+        before = previous.get(entry["case"])
+        if before is None:
+            continue
+        change = entry["trials_per_second"] / before["trials_per_second"] - 1
+        if change < -threshold:
+            regressions.append(f"{entry['case']}: {before['trials_per_second']:.0f} -> "
+                               f"{entry['trials_per_second']:.0f} trials/s ({change:+.1%})")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'case':<12}{'trials/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'peak MB':>10}{'error':>10}{'z':>7}  reference")
+    for entry in results:
+        print(f"{entry['case']:<12}{entry['trials_per_second']:>12.0f}{1000 * entry['latency_p50']:>10.2f}"
+              f"{1000 * entry['latency_p99']:>10.2f}{entry['peak_memory_bytes'] / 2 ** 20:>10.2f}"
+              f"{entry['abs_error']:>10.4f}{entry['z_score']:>7.2f}  {entry['reference_kind']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the equity engine and check for throughput regressions.")
+    parser.add_argument("--backend", choices=["numpy", "python"], default="numpy")
+    parser.add_argument("--trials", type=int, default=100000, help="Trials per timed call.")
+    parser.add_argument("--repeats", type=int, default=15, help="Timed calls per case.")
+    parser.add_argument("--opponents", default="1-9", help="Opponent counts, e.g. '1-9' or '1,2,6'.")
+    parser.add_argument("--stages", default=",".join(SPOTS), help="Comma-separated subset of " + ", ".join(SPOTS) + ".")
+    parser.add_argument("--reference-trials", type=int, default=2000000, help="Samples for reference values that cannot be enumerated.")
+    parser.add_argument("--save", help="Write the results to this JSON file as a new baseline.")
+    parser.add_argument("--compare", help="Baseline JSON file to check throughput against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed fractional throughput drop before failing.")
+    parser.add_argument("--startup", action="store_true", help="Only check cold start time and per-player memory against their budgets.")
+    for name, limit in STARTUP_BUDGET.items():
+        parser.add_argument("--max-" + name.replace("_", "-"), type=float, default=limit, dest=name)
+    args = parser.parse_args()
+
+    if args.startup:
+        startup = measure_startup()
+        print(f"import {1000 * startup['import_seconds']:.1f} ms, game {1000 * startup['game_seconds']:.2f} ms, "
+              f"add_player {1000 * startup['player_seconds']:.3f} ms and {startup['player_bytes']:.0f} bytes")
+        failures = over_budget(startup, {name: getattr(args, name) for name in STARTUP_BUDGET})
+        if failures:
+            print("Over the startup budget:")
+            for line in failures:
+                print(f"  {line}")
+            sys.exit(1)
+        print("Within the startup budget.")
+        return
+
+    if "-" in args.opponents:
+        low, high = (int(part) for part in args.opponents.split("-"))
+        opponents = range(low, high + 1)
+    else:
+        opponents = [int(part) for part in args.opponents.split(",")]
+    stages = [stage for stage in args.stages.split(",") if stage]
+
+    results = run_suite(args.backend, args.trials, args.repeats, opponents, stages, args.reference_trials)
+    print_table(results)
+
+    report = {"backend": args.backend, "trials": args.trials, "repeats": args.repeats,
+              "python": platform.python_version(), "numpy": np.__version__, "results": results}
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        mismatches = incompatible(report, baseline)
+        if mismatches:
+            print("Not comparing with a baseline run under different settings:")
+            for line in mismatches:
+                print(f"  {line}")
+            sys.exit(2)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Throughput regressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No throughput regressions.")
+
+
+if __name__ == "__main__":
+    main()
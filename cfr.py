@@ -0,0 +1,307 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from equity import BatchEquityEngine
+from lookup import evaluate_with_board
+from preflop_table import NUM_CLASSES, class_indexes, hand_class_index
+
+ACTIONS = ("fold", "check", "call", "bet", "raise")
+
+
+def bucket_abstraction(num_buckets=10, num_deals=2000000, seed=0):
+    """
+    Group the 169 starting hands into equity buckets for a heads-up all-in showdown.
+
+    Returns (bucket_of_class, priors, equity) where priors[b] is the chance of
+    being dealt a hand in bucket b and equity[b0, b1] is bucket b0's expected
+    share of the pot against bucket b1.
+    """
+    engine = BatchEquityEngine(seed=seed)
+    sums = np.zeros((NUM_CLASSES, NUM_CLASSES))
+    counts = np.zeros((NUM_CLASSES, NUM_CLASSES))
+    live = np.arange(52, dtype=np.int8)
+    for start in range(0, num_deals, engine.batch_size):
+        size = min(engine.batch_size, num_deals - start)
+        deal = engine.draw(live, 9, size, engine.rng)
+        hands = deal[:, :4].reshape(size, 2, 2)
+        scores = evaluate_with_board(deal[:, 4:], hands)
+        share = np.where(scores[:, 0] < scores[:, 1], 1.0, np.where(scores[:, 0] == scores[:, 1], 0.5, 0.0))
+        first, second = class_indexes(hands[:, 0]), class_indexes(hands[:, 1])
+        np.add.at(sums, (first, second), share)
+        np.add.at(sums, (second, first), 1 - share)
+        np.add.at(counts, (first, second), 1)
+        np.add.at(counts, (second, first), 1)
+
+    # Pairs have 6 combos, suited hands 4 and offsuit hands 12.
+    rows, cols = np.divmod(np.arange(NUM_CLASSES), 13)
+    combos = np.where(rows == cols, 6, np.where(rows > cols, 4, 12)).astype(float)
+    class_equity = sums.sum(axis=1) / np.maximum(counts.sum(axis=1), 1)
+    order = np.argsort(class_equity)
+    cumulative = np.cumsum(combos[order]) / combos.sum()
+    bucket_of_class = np.empty(NUM_CLASSES, dtype=np.int16)
+    bucket_of_class[order] = np.minimum((cumulative * num_buckets - 1e-9).astype(int), num_buckets - 1)
+
+    priors = np.bincount(bucket_of_class, weights=combos, minlength=num_buckets) / combos.sum()
+    bucket_sums = np.zeros((num_buckets, num_buckets))
+    bucket_counts = np.zeros((num_buckets, num_buckets))
+    np.add.at(bucket_sums, (bucket_of_class[:, None], bucket_of_class[None, :]), sums)
+    np.add.at(bucket_counts, (bucket_of_class[:, None], bucket_of_class[None, :]), counts)
+    equity = bucket_sums / np.maximum(bucket_counts, 1)
+    return bucket_of_class, priors, equity
+
+
+class BettingTree():
+    """
+    Heads-up betting abstraction for one street: check or bet a pot fraction,
+    then fold, call or raise up to max_raises times, capped by the stacks.
+
+    Nodes are stored in flat lists and found by their action history.
+    """
+
+    def __init__(self, pot=1.5, stack=100.0, bet_fraction=1.0, max_raises=3):
+        self.pot = pot
+        self.stack = stack
+        self.bet_fraction = bet_fraction
+        self.max_raises = max_raises
+        self.player = []      # player to act, or -1 at terminals
+        self.actions = []     # action names available at each node
+        self.children = []    # child node ids, parallel to actions
+        self.contributions = []
+        self.terminal = []    # None, "fold" or "showdown"
+        self.folder = []
+        self.histories = []
+        self.node_of_history = {}
+        self.decision_index = []  # row in the regret arrays, -1 at terminals
+        self.num_decisions = 0
+        self._build((), 0, (pot / 2, pot / 2), 0)
+
+    def _add(self, history, player, contributions, terminal=None, folder=-1):
+        node = len(self.player)
+        self.player.append(player)
+        self.actions.append([])
+        self.children.append([])
+        self.contributions.append(contributions)
+        self.terminal.append(terminal)
+        self.folder.append(folder)
+        self.histories.append(history)
+        self.node_of_history[history] = node
+        self.decision_index.append(-1 if terminal else self.num_decisions)
+        if not terminal:
+            self.num_decisions += 1
+        return node
+
+    def _build(self, history, player, contributions, raises):
+        node = self._add(history, player, contributions)
+        other = 1 - player
+        to_call = contributions[other] - contributions[player]
+        behind = self.pot / 2 + self.stack - contributions[player]
+        options = []
+        if to_call > 0:
+            options.append(("fold", None))
+            options.append(("call", None))
+            if raises < self.max_raises and behind > to_call:
+                pot_after_call = sum(contributions) + to_call
+                options.append(("raise", min(behind, to_call + self.bet_fraction * pot_after_call)))
+        else:
+            options.append(("check", None))
+            if behind > 0:
+                options.append(("bet", min(behind, self.bet_fraction * sum(contributions))))
+
+        for action, amount in options:
+            child_history = history + (action,)
+            if action == "fold":
+                child = self._add(child_history, -1, contributions, "fold", player)
+            elif action == "call" or (action == "check" and history and history[-1] == "check"):
+                paid = list(contributions)
+                paid[player] += to_call
+                child = self._add(child_history, -1, tuple(paid), "showdown")
+            elif action == "check":
+                child = self._build(child_history, other, contributions, raises)
+            else:
+                paid = list(contributions)
+                paid[player] += amount
+                child = self._build(child_history, other, tuple(paid), raises + (action == "raise"))
+            self.actions[node].append(action)
+            self.children[node].append(child)
+        return node
+
+
+class CFRSolver():
+    """
+    CFR+ on a bucketed heads-up subgame.
+
+    Every information set is a (decision node, bucket) pair, so regrets and
+    the average strategy live in (decisions, buckets, actions) arrays and a
+    whole public betting node is updated for all buckets at once.
+    """
+
+    def __init__(self, tree, bucket_of_class, priors, equity):
+        self.tree = tree
+        self.bucket_of_class = np.asarray(bucket_of_class)
+        self.priors = np.asarray(priors, dtype=np.float64)
+        self.equity = np.asarray(equity, dtype=np.float64)
+        num_buckets = len(self.priors)
+        max_actions = max(len(actions) for actions in tree.actions)
+        self.regrets = np.zeros((tree.num_decisions, num_buckets, max_actions))
+        self.strategy_sum = np.zeros((tree.num_decisions, num_buckets, max_actions))
+        self.iteration = 0
+
+    def current_strategy(self, node):
+        """Regret-matching strategy at a decision node, shape (buckets, actions)."""
+        regrets = self.regrets[self.tree.decision_index[node], :, :len(self.tree.actions[node])]
+        positive = np.maximum(regrets, 0)
+        total = positive.sum(axis=1, keepdims=True)
+        uniform = np.full_like(positive, 1 / positive.shape[1])
+        return np.where(total > 0, positive / np.where(total > 0, total, 1), uniform)
+
+    def average_strategy(self, node):
+        sums = self.strategy_sum[self.tree.decision_index[node], :, :len(self.tree.actions[node])]
+        total = sums.sum(axis=1, keepdims=True)
+        uniform = np.full_like(sums, 1 / sums.shape[1])
+        return np.where(total > 0, sums / np.where(total > 0, total, 1), uniform)
+
+    def _terminal_values(self, node, reach):
+        """Counterfactual values (v0, v1) per bucket at a terminal node."""
+        tree = self.tree
+        c0, c1 = tree.contributions[node]
+        weighted0, weighted1 = self.priors * reach[0], self.priors * reach[1]
+        if tree.terminal[node] == "fold":
+            payoff = c1 if tree.folder[node] == 1 else -c0
+            return (np.full(len(self.priors), payoff * weighted1.sum()),
+                    np.full(len(self.priors), -payoff * weighted0.sum()))
+        payoff = self.equity * (c0 + c1) - c0
+        return payoff @ weighted1, -(payoff.T @ weighted0)
+
+    def _walk(self, node, reach, weight):
+        tree = self.tree
+        if tree.terminal[node]:
+            return self._terminal_values(node, reach)
+        player = tree.player[node]
+        strategy = self.current_strategy(node)
+        child_values = []
+        values = [np.zeros(len(self.priors)), np.zeros(len(self.priors))]
+        for a, child in enumerate(tree.children[node]):
+            child_reach = list(reach)
+            child_reach[player] = reach[player] * strategy[:, a]
+            v = self._walk(child, child_reach, weight)
+            child_values.append(v[player])
+            values[player] += strategy[:, a] * v[player]
+            values[1 - player] += v[1 - player]
+
+        row = tree.decision_index[node]
+        k = len(tree.children[node])
+        instant = np.stack(child_values, axis=1) - values[player][:, None]
+        self.regrets[row, :, :k] = np.maximum(self.regrets[row, :, :k] + instant, 0)
+        self.strategy_sum[row, :, :k] += weight * reach[player][:, None] * strategy
+        return values
+
+    def train(self, iterations, checkpoint_path=None, checkpoint_every=0):
+        """Run CFR+ iterations with linear averaging, checkpointing periodically."""
+        ones = np.ones(len(self.priors))
+        for _ in range(iterations):
+            self.iteration += 1
+            self._walk(0, [ones, ones], self.iteration)
+            if checkpoint_path and checkpoint_every and self.iteration % checkpoint_every == 0:
+                self.save(checkpoint_path)
+        if checkpoint_path:
+            self.save(checkpoint_path)
+        return self
+
+    def _best_response(self, node, br_player, reach):
+        tree = self.tree
+        if tree.terminal[node]:
+            return self._terminal_values(node, reach)[br_player]
+        strategy = self.average_strategy(node)
+        values = []
+        for a, child in enumerate(tree.children[node]):
+            child_reach = list(reach)
+            if tree.player[node] != br_player:
+                child_reach[tree.player[node]] = reach[tree.player[node]] * strategy[:, a]
+            values.append(self._best_response(child, br_player, child_reach))
+        if tree.player[node] == br_player:
+            return np.max(values, axis=0)
+        return np.sum(values, axis=0)
+
+    def exploitability(self):
+        """Average best-response gain against the average strategy, in big blinds per hand."""
+        ones = np.ones(len(self.priors))
+        gains = [self.priors @ self._best_response(0, player, [ones, ones]) for player in (0, 1)]
+        return sum(gains) / 2
+
+    def strategy(self, history, hole_cards):
+        """Average strategy as {action: probability} for the given action history and hole cards, in O(1)."""
+        node = self.tree.node_of_history[tuple(history)]
+        bucket = self.bucket_of_class[hand_class_index(hole_cards)]
+        row = self.average_strategy(node)[bucket]
+        return dict(zip(self.tree.actions[node], row.tolist()))
+
+    def regrets_for(self, history, hole_cards):
+        """Cumulative (CFR+) regrets as {action: regret} for an information set."""
+        node = self.tree.node_of_history[tuple(history)]
+        bucket = self.bucket_of_class[hand_class_index(hole_cards)]
+        row = self.regrets[self.tree.decision_index[node], bucket, :len(self.tree.actions[node])]
+        return dict(zip(self.tree.actions[node], row.tolist()))
+
+    def save(self, path):
+        """Write a checkpoint that load() can resume from."""
+        tree = self.tree
+        config = {"pot": tree.pot, "stack": tree.stack, "bet_fraction": tree.bet_fraction,
+                  "max_raises": tree.max_raises, "iteration": self.iteration}
+        temporary = path + ".tmp.npz"
+        np.savez(temporary, regrets=self.regrets, strategy_sum=self.strategy_sum, bucket_of_class=self.bucket_of_class,
+                 priors=self.priors, equity=self.equity, config=json.dumps(config))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            config = json.loads(str(data["config"]))
+            tree = BettingTree(config["pot"], config["stack"], config["bet_fraction"], config["max_raises"])
+            solver = cls(tree, data["bucket_of_class"], data["priors"], data["equity"])
+            solver.regrets = data["regrets"].copy()
+            solver.strategy_sum = data["strategy_sum"].copy()
+        solver.iteration = config["iteration"]
+        return solver
+
+
+def _solve(config, abstraction, iterations, path):
+    tree = BettingTree(**config)
+    solver = CFRSolver(tree, *abstraction)
+    solver.train(iterations, path)
+    return path, solver.exploitability()
+
+
+def solve_parallel(configs, iterations, paths, workers=None, num_buckets=10, seed=0):
+    """Solve independent subgames (e.g. different stack depths) in a process pool."""
+    abstraction = bucket_abstraction(num_buckets, seed=seed)
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_solve, config, abstraction, iterations, path) for config, path in zip(configs, paths)]
+        return [future.result() for future in futures]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve a bucketed heads-up betting subgame with CFR+.")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--buckets", type=int, default=10)
+    parser.add_argument("--pot", type=float, default=1.5, help="Starting pot in big blinds.")
+    parser.add_argument("--stack", type=float, default=100.0, help="Effective stack behind in big blinds.")
+    parser.add_argument("--output", default="cfr_strategy.npz")
+    parser.add_argument("--checkpoint-every", type=int, default=100)
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint at --output.")
+    args = parser.parse_args()
+
+    if args.resume and os.path.exists(args.output):
+        solver = CFRSolver.load(args.output)
+    else:
+        tree = BettingTree(args.pot, args.stack)
+        solver = CFRSolver(tree, *bucket_abstraction(args.buckets))
+    solver.train(args.iterations, args.output, args.checkpoint_every)
+    print(f"{solver.iteration} iterations, exploitability {solver.exploitability():.4f} bb/hand, saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,511 @@
+import itertools
+from collections import namedtuple
+from math import comb, factorial, sqrt
+from statistics import NormalDist
+
+import numpy as np
+from treys.lookup import LookupTable
+
+from lookup import cards_to_indexes, evaluate_with_board
+from profiling import profiler
+from ranges import COMBOS, to_weights
+
+EquityEstimate = namedtuple("EquityEstimate", ["probability", "low", "high", "trials"])
+# win: beat everyone outright; tie: split the pot; share: expected fraction of the pot;
+# opponent_share: each opponent's expected fraction; categories: final hand category frequencies.
+ShowdownOdds = namedtuple("ShowdownOdds", ["win", "tie", "share", "opponent_share", "categories", "trials"])
+# ev, variance and std_error are indexed [bet, opponents, pot]; best_bet is the
+# bet size with the highest risk-adjusted EV for each [opponents, pot].
+SweepSurface = namedtuple("SweepSurface", ["bet_sizes", "opponent_counts", "pot_sizes", "share", "ev", "variance",
+                                           "std_error", "best_bet", "trials"])
+
+# Worst treys rank in each hand category, best category first.
+CATEGORY_LIMITS = np.array([LookupTable.MAX_STRAIGHT_FLUSH, LookupTable.MAX_FOUR_OF_A_KIND, LookupTable.MAX_FULL_HOUSE,
+                            LookupTable.MAX_FLUSH, LookupTable.MAX_STRAIGHT, LookupTable.MAX_THREE_OF_A_KIND,
+                            LookupTable.MAX_TWO_PAIR, LookupTable.MAX_PAIR, LookupTable.MAX_HIGH_CARD])
+CATEGORY_NAMES = tuple(LookupTable.RANK_CLASS_TO_STRING[i] for i in range(1, 10))
+
+
+def wilson_interval(wins, trials, confidence=0.95):
+    """Wilson score interval for a win rate of wins out of trials."""
+    if trials == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    p = wins / trials
+    centre = (p + z * z / (2 * trials)) / (1 + z * z / trials)
+    half_width = z * sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / (1 + z * z / trials)
+    return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+class BatchEquityEngine():
+    """Monte Carlo equity that samples and scores thousands of trials at once."""
+
+    def __init__(self, batch_size=20000, seed=None):
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed)
+
+    def prepare(self, hole_cards, community_cards):
+        """Return (hole, board, live) index arrays for the known cards."""
+        with profiler.phase("equity.deck"):
+            hole = cards_to_indexes(hole_cards)
+            board = cards_to_indexes([card for card in community_cards if card is not None])
+            dead = np.concatenate([hole, board])
+            if len(np.unique(dead)) != len(dead):
+                raise ValueError("Hole and community cards must not contain duplicates.")
+            live = np.setdiff1d(np.arange(52, dtype=np.int8), dead)
+        return hole, board, live
+
+    def draw(self, live, num_cards, num_trials, rng):
+        """Draw num_cards distinct live cards for each trial with a partial Fisher-Yates shuffle."""
+        deck = np.broadcast_to(live, (num_trials, len(live))).copy()
+        rows = np.arange(num_trials)
+        for i in range(num_cards):
+            j = rng.integers(i, len(live), size=num_trials)
+            picked = deck[rows, j]
+            deck[rows, j] = deck[:, i]
+            deck[:, i] = picked
+        return deck[:, :num_cards]
+
+    def sample(self, board, live, num_opponents, num_trials, rng):
+        """Complete the board and deal opponent hands, returning (boards, opponent_hands)."""
+        missing = 5 - len(board)
+        with profiler.phase("equity.draw"):
+            drawn = self.draw(live, missing + 2 * num_opponents, num_trials, rng)
+        boards = np.concatenate([np.broadcast_to(board, (num_trials, len(board))), drawn[:, :missing]], axis=1)
+        opponent_hands = drawn[:, missing:].reshape(num_trials, num_opponents, 2)
+        return boards, opponent_hands
+
+    def score(self, hole, boards, opponent_hands):
+        """Return (your_scores, opponent_scores) for sampled boards and hands."""
+        hands = np.concatenate([np.broadcast_to(hole, (len(boards), 1, 2)), opponent_hands], axis=1)
+        with profiler.phase("equity.evaluate"):
+            scores = evaluate_with_board(boards, hands)
+        profiler.count("evaluations", hands.shape[0] * hands.shape[1])
+        return scores[:, 0], scores[:, 1:]
+
+    def count_wins(self, hole_cards, community_cards, num_opponents, num_trials, rng=None):
+        """Count trials where your hand beats every opponent outright."""
+        rng = self.rng if rng is None else rng
+        hole, board, live = self.prepare(hole_cards, community_cards)
+        profiler.count("trials", num_trials)
+        wins = 0
+        for start in range(0, num_trials, self.batch_size):
+            size = min(self.batch_size, num_trials - start)
+            boards, opponent_hands = self.sample(board, live, num_opponents, size, rng)
+            your_scores, opponent_scores = self.score(hole, boards, opponent_hands)
+            wins += int(np.count_nonzero((your_scores[:, None] < opponent_scores).all(axis=1)))
+        return wins
+
+    def showdown_odds(self, hole_cards, community_cards, num_opponents, num_simulations=100000):
+        """
+        Win, tie and expected pot share, every opponent's share and your final
+        hand categories, all from the same sampled showdowns.
+
+        A pot split k ways gives each of the k best hands 1/k of it.
+
+        :return: ShowdownOdds.
+        """
+        hole, board, live = self.prepare(hole_cards, community_cards)
+        profiler.count("trials", num_simulations)
+        wins = ties = 0
+        shares = np.zeros(num_opponents + 1)
+        categories = np.zeros(len(CATEGORY_LIMITS), dtype=np.int64)
+        for start in range(0, num_simulations, self.batch_size):
+            size = min(self.batch_size, num_simulations - start)
+            boards, opponent_hands = self.sample(board, live, num_opponents, size, self.rng)
+            your_scores, opponent_scores = self.score(hole, boards, opponent_hands)
+            scores = np.concatenate([your_scores[:, None], opponent_scores], axis=1)
+            best = scores == scores.min(axis=1, keepdims=True)
+            num_best = best.sum(axis=1)
+            wins += int(np.count_nonzero(best[:, 0] & (num_best == 1)))
+            ties += int(np.count_nonzero(best[:, 0] & (num_best > 1)))
+            shares += (best / num_best[:, None]).sum(axis=0)
+            categories += np.bincount(np.searchsorted(CATEGORY_LIMITS, your_scores), minlength=len(CATEGORY_LIMITS))
+        shares /= num_simulations
+        return ShowdownOdds(wins / num_simulations, ties / num_simulations, float(shares[0]),
+                            tuple(shares[1:].tolist()), dict(zip(CATEGORY_NAMES, (categories / num_simulations).tolist())),
+                            num_simulations)
+
+    def sweep(self, hole_cards, community_cards, bet_sizes, opponent_counts, pot_sizes, num_simulations=20000,
+              risk_aversion=0.0):
+        """
+        EV and variance of betting each size, for every opponent count and pot size, from one simulation.
+
+        Every trial deals max(opponent_counts) opponents and the first k of them
+        stand for k opponents, so all grid points share the same runouts. A bet
+        b into pot P that all k opponents call pays share * (P + (k + 1) * b) - b,
+        where share is your part of the pot on that runout; a bet of 0 is a check.
+
+        :param risk_aversion: Standard deviations of payoff subtracted from the EV when picking best_bet.
+        :return: SweepSurface.
+        """
+        bet_sizes = np.asarray(bet_sizes, dtype=np.float64)
+        opponent_counts = np.asarray(opponent_counts, dtype=np.intp)
+        pot_sizes = np.asarray(pot_sizes, dtype=np.float64)
+        if not len(opponent_counts) or opponent_counts.min() < 1:
+            raise ValueError("Opponent counts must be at least 1.")
+        max_opponents = int(opponent_counts.max())
+        hole, board, live = self.prepare(hole_cards, community_cards)
+        profiler.count("trials", num_simulations)
+        total = np.zeros(max_opponents)
+        total_squares = np.zeros(max_opponents)
+        for start in range(0, num_simulations, self.batch_size):
+            size = min(self.batch_size, num_simulations - start)
+            boards, opponent_hands = self.sample(board, live, max_opponents, size, self.rng)
+            your_scores, opponent_scores = self.score(hole, boards, opponent_hands)
+            # Column k - 1 describes the first k opponents.
+            best_opponent = np.minimum.accumulate(opponent_scores, axis=1)
+            splitting = np.cumsum(opponent_scores == your_scores[:, None], axis=1)
+            share = np.where(your_scores[:, None] <= best_opponent, 1 / (1 + splitting), 0.0)
+            total += share.sum(axis=0)
+            total_squares += (share ** 2).sum(axis=0)
+        mean = total / num_simulations
+        share_variance = np.maximum(total_squares / num_simulations - mean ** 2, 0)
+
+        k = opponent_counts[None, :, None]
+        bets = bet_sizes[:, None, None]
+        final_pot = pot_sizes[None, None, :] + (k + 1) * bets
+        ev = mean[k - 1] * final_pot - bets
+        variance = share_variance[k - 1] * final_pot ** 2
+        best_bet = bet_sizes[np.argmax(ev - risk_aversion * np.sqrt(variance), axis=0)]
+        return SweepSurface(bet_sizes, opponent_counts, pot_sizes, mean[opponent_counts - 1], ev, variance,
+                            np.sqrt(variance / num_simulations), best_bet, num_simulations)
+
+    def count_states(self, num_live, num_missing, num_opponents):
+        """Number of distinct board completions times unordered opponent holdings."""
+        remaining = num_live - num_missing
+        holdings = 1
+        for i in range(num_opponents):
+            holdings *= comb(remaining - 2 * i, 2)
+        return comb(num_live, num_missing) * holdings // factorial(num_opponents)
+
+    def should_enumerate(self, hole_cards, community_cards, num_opponents, num_simulations):
+        """
+        True when exact enumeration scores no more hands than sampling would.
+
+        Enumeration scores your hand and every remaining two-card holding once
+        per board completion, whatever the opponent count; sampling scores
+        num_opponents + 1 hands per trial.
+        """
+        if num_opponents not in (1, 2):
+            return False
+        known = len([card for card in hole_cards + community_cards if card is not None])
+        num_live, num_missing = 52 - known, 7 - known
+        evaluations = comb(num_live, num_missing) * (comb(num_live - num_missing, 2) + 1)
+        return evaluations <= num_simulations * (num_opponents + 1)
+
+    def exact_win_probability(self, hole_cards, community_cards, num_opponents, max_evaluations=2000000):
+        """
+        Enumerate every board completion and opponent holding to get the exact win probability.
+
+        Each opponent hand is scored once per board and the holdings that lose
+        to you are counted combinatorially, so two opponents cost no more
+        evaluations than one.
+
+        :param max_evaluations: Upper bound on hands scored per batch of boards.
+        :return: Exact probability of beating every opponent outright.
+        """
+        if num_opponents not in (1, 2):
+            raise ValueError("Exact enumeration supports one or two opponents.")
+        hole, board, live = self.prepare(hole_cards, community_cards)
+        num_missing = 5 - len(board)
+
+        hands = np.array(list(itertools.combinations(live, 2)), dtype=np.int8)
+        incidence = np.zeros((len(hands), 52), dtype=np.int32)
+        incidence[np.arange(len(hands))[:, None], hands] = 1
+
+        completions = list(itertools.combinations(live, num_missing))
+        completions = np.array(completions, dtype=np.int8).reshape(len(completions), num_missing)
+        chunk = max(1, max_evaluations // len(hands))
+        winning = 0
+        for start in range(0, len(completions), chunk):
+            drawn = completions[start:start + chunk]
+            boards = np.concatenate([np.broadcast_to(board, (len(drawn), len(board))), drawn], axis=1)
+            with profiler.phase("equity.evaluate"):
+                your_scores = evaluate_with_board(boards, np.broadcast_to(hole, (len(boards), 1, 2)))[:, 0]
+                opponent_scores = evaluate_with_board(boards, np.broadcast_to(hands, (len(boards),) + hands.shape))
+            profiler.count("evaluations", len(boards) * (1 + len(hands)))
+
+            # An opponent hand only counts if it avoids the drawn board cards.
+            blocked = np.zeros((len(boards), 52), dtype=np.int32)
+            blocked[np.arange(len(boards))[:, None], drawn] = 1
+            beaten = (opponent_scores > your_scores[:, None]) & (blocked @ incidence.T == 0)
+
+            num_beaten = beaten.sum(axis=1, dtype=np.int64)
+            if num_opponents == 1:
+                winning += int(num_beaten.sum())
+            else:
+                # Disjoint pairs of beaten hands: all pairs minus those sharing a card.
+                degrees = beaten.astype(np.int64) @ incidence
+                winning += int((num_beaten ** 2 - (degrees ** 2).sum(axis=1) + num_beaten).sum()) // 2
+
+        return winning / self.count_states(len(live), num_missing, num_opponents)
+
+    def win_probability(self, hole_cards, community_cards, num_opponents, num_simulations=100000):
+        """
+        Estimate the probability of winning outright against num_opponents random hands.
+
+        Spots with fewer distinct runouts and holdings than num_simulations are
+        enumerated exactly instead of sampled.
+        """
+        if self.should_enumerate(hole_cards, community_cards, num_opponents, num_simulations):
+            return self.exact_win_probability(hole_cards, community_cards, num_opponents)
+        return self.count_wins(hole_cards, community_cards, num_opponents, num_simulations) / num_simulations
+
+    def iter_win_probability(self, hole_cards, community_cards, num_opponents, num_simulations=100000,
+                             first_batch=1000, confidence=0.95, stop=None):
+        """
+        Yield a running EquityEstimate after every batch, refining towards num_simulations trials.
+
+        The first batch is small so a rough answer arrives within milliseconds;
+        later batches double up to batch_size. Stop iterating (or set the
+        threading.Event stop) to cancel between batches. Enumerable spots yield
+        their exact value once.
+        """
+        if self.should_enumerate(hole_cards, community_cards, num_opponents, num_simulations):
+            probability = self.exact_win_probability(hole_cards, community_cards, num_opponents)
+            yield EquityEstimate(probability, probability, probability, num_simulations)
+            return
+        wins = trials = 0
+        size = first_batch
+        while trials < num_simulations and not (stop is not None and stop.is_set()):
+            size = min(size, num_simulations - trials)
+            wins += self.count_wins(hole_cards, community_cards, num_opponents, size)
+            trials += size
+            yield EquityEstimate(wins / trials, *wilson_interval(wins, trials, confidence), trials)
+            size = min(2 * size, self.batch_size)
+
+    def adaptive_win_probability(self, hole_cards, community_cards, num_opponents, margin=0.01, threshold=None,
+                                 confidence=0.95, batch_size=5000, max_simulations=1000000):
+        """
+        Sample in batches until the answer is resolved to the precision asked for.
+
+        Sampling stops once the confidence interval is narrower than
+        +/- margin or, when threshold is given (e.g. the pot odds), as soon as
+        the interval lies entirely above or below it.
+
+        :return: EquityEstimate(probability, low, high, trials).
+        """
+        if self.should_enumerate(hole_cards, community_cards, num_opponents, max_simulations):
+            probability = self.exact_win_probability(hole_cards, community_cards, num_opponents)
+            known = len([card for card in hole_cards + community_cards if card is not None])
+            return EquityEstimate(probability, probability, probability,
+                                  self.count_states(52 - known, 7 - known, num_opponents))
+
+        wins = trials = 0
+        while trials < max_simulations:
+            size = min(batch_size, max_simulations - trials)
+            wins += self.count_wins(hole_cards, community_cards, num_opponents, size)
+            trials += size
+            low, high = wilson_interval(wins, trials, confidence)
+            if (high - low) / 2 <= margin:
+                break
+            if threshold is not None and (low > threshold or high < threshold):
+                break
+        return EquityEstimate(wins / trials, low, high, trials)
+
+    def sample_ranges(self, board, live, ranges, num_trials, rng, max_rounds=1000):
+        """
+        Deal each ranged opponent a combo from its weighted range, then complete the board.
+
+        The combos of all ranged opponents are drawn together and a trial is
+        redrawn in full whenever any two of them share a card, which samples
+        the joint distribution (weights multiplied, overlapping deals
+        excluded) exactly. Opponents without a range and the board come from
+        the cards left in each trial.
+
+        :param ranges: One (combo_cards, weights) pair per opponent, already
+            cleared of combos blocked by the known cards, or None for any two cards.
+        """
+        rows = np.arange(num_trials)
+        used = np.zeros((num_trials, 52), dtype=bool)
+        opponent_hands = np.empty((num_trials, len(ranges), 2), dtype=np.int8)
+        ranged = [k for k, hand_range in enumerate(ranges) if hand_range is not None]
+        cumulative = [np.cumsum(ranges[k][1]) for k in ranged]
+        pending = rows
+        for _ in range(max_rounds):
+            for k, totals in zip(ranged, cumulative):
+                pick = np.searchsorted(totals, rng.random(len(pending)) * totals[-1], side="right")
+                opponent_hands[pending, k] = ranges[k][0][pick]
+            dealt = np.sort(opponent_hands[pending][:, ranged].reshape(len(pending), -1), axis=1)
+            pending = pending[(dealt[:, 1:] == dealt[:, :-1]).any(axis=1)]
+            if not len(pending):
+                break
+        else:
+            raise ValueError("Opponent ranges overlap too much to deal every opponent a hand.")
+        if ranged:
+            dealt = opponent_hands[:, ranged].reshape(num_trials, -1)
+            used[rows[:, None], dealt] = True
+
+        # Everything else comes from the cards left in each trial: random keys
+        # with dealt cards pushed to the back, smallest keys first.
+        missing = 5 - len(board)
+        unranged = [k for k, hand_range in enumerate(ranges) if hand_range is None]
+        keys = rng.random((num_trials, len(live)))
+        keys[used[:, live]] = 2.0
+        drawn = live[np.argsort(keys, axis=1)[:, :missing + 2 * len(unranged)]]
+        if unranged:
+            opponent_hands[:, unranged] = drawn[:, missing:].reshape(num_trials, len(unranged), 2)
+        boards = np.concatenate([np.broadcast_to(board, (num_trials, len(board))), drawn[:, :missing]], axis=1)
+        return boards, opponent_hands
+
+    def range_win_probability(self, hole_cards, community_cards, opponent_ranges, num_simulations=100000, share=False):
+        """
+        Estimate the outright win probability against opponents holding weighted ranges.
+
+        :param opponent_ranges: One entry per opponent: a range string such as
+            "QQ+,AKs,AQo", a 1326-combo weight vector, or None for any two cards.
+        :param share: Return the expected pot share instead, counting split pots as in showdown_odds.
+        """
+        hole, board, live = self.prepare(hole_cards, community_cards)
+        alive = np.zeros(52, dtype=bool)
+        alive[live] = True
+        ranges = []
+        for hand_range in opponent_ranges:
+            if hand_range is None:
+                ranges.append(None)
+                continue
+            weights = to_weights(hand_range) * (alive[COMBOS[:, 0]] & alive[COMBOS[:, 1]])
+            combos = np.flatnonzero(weights > 0)
+            if not len(combos):
+                raise ValueError(f"No combo in range {hand_range!r} is possible with the known cards.")
+            ranges.append((COMBOS[combos].astype(np.intp), weights[combos]))
+
+        profiler.count("trials", num_simulations)
+        wins = 0
+        for start in range(0, num_simulations, self.batch_size):
+            size = min(self.batch_size, num_simulations - start)
+            with profiler.phase("equity.draw"):
+                boards, opponent_hands = self.sample_ranges(board, live, ranges, size, self.rng)
+            your_scores, opponent_scores = self.score(hole, boards, opponent_hands)
+            if share:
+                splitting = (opponent_scores == your_scores[:, None]).sum(axis=1)
+                wins += float(np.where(your_scores <= opponent_scores.min(axis=1), 1 / (1 + splitting), 0.0).sum())
+            else:
+                wins += int(np.count_nonzero((your_scores[:, None] < opponent_scores).all(axis=1)))
+        return wins / num_simulations
+
+    def spot_win_probabilities(self, holes, boards, num_opponents, num_trials, rng=None):
+        """
+        Estimate many independent spots in one vectorized pass.
+
+        :param holes: (n, 2) array of hole card indexes.
+        :param boards: (n, k) array of known board card indexes, the same k for every spot.
+        :return: (n,) array of outright win probabilities.
+        """
+        rng = self.rng if rng is None else rng
+        holes = np.asarray(holes, dtype=np.intp)
+        boards = np.asarray(boards, dtype=np.intp).reshape(len(holes), -1)
+        missing = 5 - boards.shape[1]
+        needed = missing + 2 * num_opponents
+        dead = np.concatenate([holes, boards], axis=1)
+        spots_per_batch = max(1, self.batch_size // num_trials)
+        result = np.empty(len(holes))
+        for start in range(0, len(holes), spots_per_batch):
+            stop = min(start + spots_per_batch, len(holes))
+            rows = (stop - start) * num_trials
+            # Random keys with the dead cards pushed to the back deal each
+            # trial from its own spot's live cards.
+            with profiler.phase("equity.draw"):
+                keys = rng.random((rows, 52))
+                spot_dead = np.repeat(dead[start:stop], num_trials, axis=0)
+                keys[np.arange(rows)[:, None], spot_dead] = 2.0
+                drawn = np.argsort(keys, axis=1)[:, :needed]
+            full_boards = np.concatenate([np.repeat(boards[start:stop], num_trials, axis=0), drawn[:, :missing]], axis=1)
+            hands = np.concatenate([spot_dead[:, None, :2], drawn[:, missing:].reshape(rows, num_opponents, 2)], axis=1)
+            with profiler.phase("equity.evaluate"):
+                scores = evaluate_with_board(full_boards, hands)
+            profiler.count("trials", rows)
+            profiler.count("evaluations", rows * (1 + num_opponents))
+            wins = (scores[:, :1] < scores[:, 1:]).all(axis=1)
+            result[start:stop] = wins.reshape(stop - start, num_trials).mean(axis=1)
+        return result
+
+
+class EquitySession():
+    """
+    Equity for one hand that carries its sampled runouts from street to street.
+
+    Samples whose board already contains every newly dealt card (and whose
+    opponents do not hold one) are still valid draws for the later street.
+    Their outcome is unchanged because the final board is the same set of
+    cards, so they are kept as-is and only the shortfall is sampled fresh.
+    Spots small enough to enumerate are answered exactly.
+    """
+
+    def __init__(self, hole_cards, num_opponents, num_simulations=100000, engine=None):
+        self.hole_cards = list(hole_cards)
+        self.num_opponents = num_opponents
+        self.num_simulations = num_simulations
+        self.engine = engine or BatchEquityEngine()
+        self.community_cards = []
+        self.boards = None
+        self.opponent_hands = None
+        self.wins = None
+        self.reused = 0
+        self.sampled = 0
+
+    def continues(self, hole_cards, community_cards, num_opponents):
+        """True when the spot is this hand on the same or a later street."""
+        known = [card for card in community_cards if card is not None]
+        return (set(hole_cards) == set(self.hole_cards) and num_opponents == self.num_opponents
+                and set(self.community_cards) <= set(known))
+
+    def update(self, community_cards):
+        """Return the outright win probability on the board dealt so far."""
+        for estimate in self.iter_update(community_cards, first_batch=self.engine.batch_size):
+            pass
+        return estimate.probability
+
+    def iter_update(self, community_cards, first_batch=1000, confidence=0.95, stop=None):
+        """
+        Like update, but yield a running EquityEstimate as samples come in.
+
+        The first estimate comes from the samples carried over from the last
+        street when there are any, so it costs no simulation at all.
+        """
+        self.community_cards = [card for card in community_cards if card is not None]
+        engine = self.engine
+        if engine.should_enumerate(self.hole_cards, self.community_cards, self.num_opponents, self.num_simulations):
+            self.reused, self.sampled = 0, 0
+            probability = engine.exact_win_probability(self.hole_cards, self.community_cards, self.num_opponents)
+            yield EquityEstimate(probability, probability, probability, self.num_simulations)
+            return
+
+        hole, board, live = engine.prepare(self.hole_cards, self.community_cards)
+        if self.boards is not None and len(board):
+            keep = np.ones(len(self.boards), dtype=bool)
+            for card in board:
+                keep &= (self.boards == card).any(axis=1)
+                keep &= ~(self.opponent_hands == card).any(axis=(1, 2))
+            # Each update assigns all three arrays in one statement, so an
+            # interrupt between them cannot leave them different lengths.
+            self.boards, self.opponent_hands, self.wins = (
+                self.boards[keep], self.opponent_hands[keep], self.wins[keep])
+        elif self.boards is None:
+            self.boards, self.opponent_hands, self.wins = (
+                np.empty((0, 5), dtype=np.int8), np.empty((0, self.num_opponents, 2), dtype=np.int8),
+                np.empty(0, dtype=bool))
+
+        self.reused = len(self.wins)
+        self.sampled = 0
+        if self.reused:
+            yield self.estimate(confidence)
+        size = first_batch
+        while len(self.wins) < self.num_simulations and not (stop is not None and stop.is_set()):
+            size = min(size, self.num_simulations - len(self.wins))
+            boards, opponent_hands = engine.sample(board, live, self.num_opponents, size, engine.rng)
+            your_scores, opponent_scores = engine.score(hole, boards, opponent_hands)
+            wins = (your_scores[:, None] < opponent_scores).all(axis=1)
+            self.boards, self.opponent_hands, self.wins = (
+                np.concatenate([self.boards, boards.astype(np.int8)]),
+                np.concatenate([self.opponent_hands, opponent_hands]),
+                np.concatenate([self.wins, wins]))
+            self.sampled += size
+            yield self.estimate(confidence)
+            size = min(2 * size, engine.batch_size)
+
+    def estimate(self, confidence=0.95):
+        """EquityEstimate from the samples currently held."""
+        wins, trials = int(self.wins.sum()), len(self.wins)
+        return EquityEstimate(wins / trials, *wilson_interval(wins, trials, confidence), trials)
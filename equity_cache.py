@@ -0,0 +1,127 @@
+import itertools
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from treys import Card
+
+SUIT_BITS = (1, 2, 4, 8)
+SUIT_PERMUTATIONS = list(itertools.permutations(range(4)))
+
+
+def canonical_key(hole_cards, community_cards, num_opponents, precision):
+    """
+    Key a spot so that suit-isomorphic spots share an entry.
+
+    Cards become (rank, suit) pairs, hole cards and board are sorted, and the
+    suit relabelling giving the smallest tuple is kept.
+    """
+    hole = [(Card.get_rank_int(card), SUIT_BITS.index(Card.get_suit_int(card))) for card in hole_cards]
+    board = [(Card.get_rank_int(card), SUIT_BITS.index(Card.get_suit_int(card)))
+             for card in community_cards if card is not None]
+    best = None
+    for permutation in SUIT_PERMUTATIONS:
+        candidate = (tuple(sorted((rank, permutation[suit]) for rank, suit in hole)),
+                     tuple(sorted((rank, permutation[suit]) for rank, suit in board)))
+        if best is None or candidate < best:
+            best = candidate
+    return best + (num_opponents, precision)
+
+
+class EquityCache():
+    """
+    Size-bounded LRU cache of equity results with hit, miss and eviction counters.
+
+    Safe to share between threads: every access to the entries holds a lock,
+    but compute() in get_or_compute runs outside it, so two threads missing
+    on the same key may both simulate it.
+    """
+
+    def __init__(self, maxsize=100000, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self.lock:
+            value = self.entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, calling compute() and storing it on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        with self.lock:
+            return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions}
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def save(self, path=None):
+        """Write the entries, oldest first, to a JSON file."""
+        path = path or self.path
+        with self.lock:
+            entries = [[_to_lists(key), value] for key, value in self.entries.items()]
+        with open(path + ".tmp", "w") as f:
+            json.dump(entries, f)
+        os.replace(path + ".tmp", path)
+
+    def load(self, path=None):
+        """Add the entries stored at path, keeping at most maxsize of the newest."""
+        path = path or self.path
+        with open(path) as f:
+            for key, value in json.load(f):
+                self.put(_to_tuples(key), value)
+
+
+def _to_lists(key):
+    hole, board, num_opponents, precision = key
+    return [[list(card) for card in hole], [list(card) for card in board], num_opponents, precision]
+
+
+def _to_tuples(key):
+    hole, board, num_opponents, precision = key
+    return (tuple(tuple(card) for card in hole), tuple(tuple(card) for card in board), num_opponents, precision)
+
+
+# Shared by every PokerSimulator unless one is given its own cache. Loaded
+# from POKER_EQUITY_CACHE at import, and saved back there when the CLI exits;
+# advisor_server workers start from the loaded entries but do not save theirs.
+DEFAULT_CACHE = EquityCache(path=os.environ.get("POKER_EQUITY_CACHE"))
+
+
+def save_default_cache():
+    """Persist DEFAULT_CACHE when POKER_EQUITY_CACHE names a file for it."""
+    if DEFAULT_CACHE.path is not None:
+        DEFAULT_CACHE.save()
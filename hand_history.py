@@ -0,0 +1,292 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+
+import numpy as np
+
+from lookup import INDEX_TO_CARD, cards_to_indexes
+
+# Event kinds. A hand is HAND, one PLAYER per seat with the balance at the
+# start of the hand, then HOLE, BOARD, BET, FOLD and ADVICE events in the
+# order they happened and finally WIN, or ABORTED when the hand was cut off
+# (the log closed or a new hand started) before it was resolved.
+HAND, PLAYER, HOLE, BOARD, BET, FOLD, ADVICE, WIN, ABORTED = range(9)
+KINDS = {"hand": HAND, "player": PLAYER, "hole": HOLE, "board": BOARD, "bet": BET, "fold": FOLD,
+         "advice": ADVICE, "win": WIN, "aborted": ABORTED}
+
+# 24 bytes per event; cards are 0-51 indexes padded with -1.
+EVENT_DTYPE = np.dtype([("session", "<u4"), ("hand", "<u4"), ("kind", "u1"), ("seat", "u1"), ("round", "u1"),
+                        ("cards", "i1", (5,)), ("amount", "<f8")])
+# One entry per finished hand: where its events start in the log and how many there are.
+INDEX_DTYPE = np.dtype([("session", "<u4"), ("hand", "<u4"), ("start", "<u8"), ("count", "<u4")])
+SPOT_DTYPE = np.dtype([("session", "<u4"), ("hand", "<u4"), ("round", "u1"), ("opponents", "u1"),
+                       ("equity", "<f8")])
+
+
+def _paths(path):
+    return path + ".idx", path + ".sessions.json"
+
+
+def _load_sessions(path):
+    sessions_path = _paths(path)[1]
+    if not os.path.exists(sessions_path):
+        return {}
+    with open(sessions_path) as f:
+        return {int(session): players for session, players in json.load(f).items()}
+
+
+class HandHistory():
+    """
+    Append-only hand-history log.
+
+    Events are fixed-width binary records buffered in memory and appended
+    to the log in batches; each finished hand also gets an index entry so
+    a hand can be found without scanning. Player names per session live in
+    a small JSON sidecar. One writer per log at a time.
+    """
+
+    def __init__(self, path, session=None, batch_size=4096):
+        self.path = path
+        self.index_path, self.sessions_path = _paths(path)
+        self.batch_size = batch_size
+        self.sessions = _load_sessions(path)
+        self.session = session if session is not None else max(self.sessions, default=-1) + 1
+        self.seats = self.sessions.setdefault(self.session, [])
+        self.written = os.path.getsize(path) // EVENT_DTYPE.itemsize if os.path.exists(path) else 0
+        self.events = []
+        self.index = []
+        self.hand = max((entry["hand"] for entry in read_index(path) if entry["session"] == self.session), default=-1)
+        self.hand_start = None
+        self.round = 0
+
+    def seat(self, name):
+        if name not in self.seats:
+            self.seats.append(name)
+        return self.seats.index(name)
+
+    def start_hand(self, players):
+        """Begin a new hand with (name, balance) pairs for everyone seated."""
+        if self.hand_start is not None:
+            self.end_hand(aborted=True)
+        self.hand += 1
+        self.round = 0
+        self.hand_start = self.written + len(self.events)
+        self.record(HAND)
+        for name, balance in players:
+            self.record(PLAYER, name, balance)
+
+    def record(self, kind, player=None, amount=0, cards=()):
+        """Add one event to the current hand; kind is one of the constants above or its name in KINDS."""
+        kind = KINDS.get(kind, kind)
+        if self.hand_start is None:
+            raise ValueError("Start a hand before recording events.")
+        padded = [-1] * 5
+        padded[:len(cards)] = cards_to_indexes(cards).tolist() if len(cards) else []
+        if kind == BOARD:
+            self.round = {3: 1, 4: 2, 5: 3}.get(len(cards), self.round)
+        seat = self.seat(player) if player is not None else 255
+        self.events.append((self.session, self.hand, kind, seat, self.round, padded, amount))
+
+    def end_hand(self, aborted=False):
+        """
+        Finish the current hand and index it.
+
+        :param aborted: True when the hand was not played out; it is marked
+            with an ABORTED event so readers can tell it from a resolved hand.
+        """
+        if self.hand_start is None:
+            return
+        if aborted:
+            self.record(ABORTED)
+        self.index.append((self.session, self.hand, self.hand_start, self.written + len(self.events) - self.hand_start))
+        self.hand_start = None
+        if len(self.events) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Append buffered finished hands to the log, its index and the session sidecar."""
+        # Events of a hand still in progress stay buffered.
+        finished = self.index[-1][2] + self.index[-1][3] - self.written if self.index else 0
+        if finished:
+            with open(self.path, "ab") as f:
+                np.array(self.events[:finished], dtype=EVENT_DTYPE).tofile(f)
+            with open(self.index_path, "ab") as f:
+                np.array(self.index, dtype=INDEX_DTYPE).tofile(f)
+            del self.events[:finished]
+            self.written += finished
+            self.index = []
+        with open(self.sessions_path + ".tmp", "w") as f:
+            json.dump(self.sessions, f)
+        os.replace(self.sessions_path + ".tmp", self.sessions_path)
+
+    def close(self):
+        self.end_hand(aborted=True)
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_index(path):
+    index_path = _paths(path)[0]
+    if not os.path.exists(index_path):
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    return np.fromfile(index_path, dtype=INDEX_DTYPE)
+
+
+class HandHistoryReader():
+    """Memory-mapped read access to a hand-history log."""
+
+    def __init__(self, path):
+        self.path = path
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        self.events = np.memmap(path, dtype=EVENT_DTYPE, mode="r") if size else np.zeros(0, dtype=EVENT_DTYPE)
+        self.index = read_index(path)
+        self.sessions = _load_sessions(path)
+        self.positions = {(int(entry["session"]), int(entry["hand"])): i for i, entry in enumerate(self.index)}
+
+    def __len__(self):
+        return len(self.index)
+
+    def hand(self, session, hand):
+        """Return the events of one hand."""
+        entry = self.index[self.positions[(session, hand)]]
+        return self.events[entry["start"]:entry["start"] + entry["count"]]
+
+    def aborted(self, session, hand):
+        """True when the hand was cut off before it was resolved."""
+        return bool((self.hand(session, hand)["kind"] == ABORTED).any())
+
+    def replay(self, session, hand, upto=None):
+        """
+        Rebuild the PokerGame as it stood after the first upto events of a hand (all of them by default).
+
+        Players are restored with their balances at the start of the hand, the
+        recorded hole cards become the main player's, and bets, folds, board
+        cards and the winner's payout are applied in order. An aborted hand
+        has no end state, so replaying one needs upto.
+        """
+        from poker_main import PokerGame
+
+        if upto is None and self.aborted(session, hand):
+            raise ValueError(f"Hand {hand} of session {session} was aborted before it was resolved; pass upto.")
+        names = self.sessions[session]
+        events = self.hand(session, hand)[:upto]
+        with contextlib.redirect_stdout(io.StringIO()):
+            game = PokerGame(0)
+            game.pot_total = 0
+            for event in events:
+                kind, name = event["kind"], names[event["seat"]] if event["seat"] < len(names) else None
+                cards = [int(INDEX_TO_CARD[card]) for card in event["cards"] if card >= 0]
+                if kind == PLAYER:
+                    game.add_player(name)
+                    game.players[-1].balance = game.original_players[-1].balance = float(event["amount"])
+                elif kind == HOLE:
+                    game.main_player = game.find_player(name)
+                    game.hole_cards = cards
+                elif kind == BOARD:
+                    game.community_cards = cards
+                    game.round = int(event["round"])
+                    game.highest_bet = 0
+                elif kind == BET:
+                    if game.place_bet(name, float(event["amount"])):
+                        game.pot_total += float(event["amount"])
+                elif kind == FOLD:
+                    player = game.find_player(name)
+                    player.fold()
+                    game.players.remove(player)
+                    game.folded_players.append(player)
+                elif kind == ADVICE:
+                    game.bet = float(event["amount"])
+                elif kind == WIN:
+                    game.find_player(name).win(float(event["amount"]))
+            game.num_players = len(game.players) + len(game.folded_players)
+        return game
+
+    def spots(self, chunk_hands=100000):
+        """
+        Yield, chunk by chunk, every decision point where hole cards were known.
+
+        Aborted hands are skipped, since they never reached a result.
+
+        :return: Iterator of (session, hand, round, opponents, hole (n, 2), board (n, k)) groups,
+            one per board size and opponent count, where opponents excludes folded players.
+        """
+        for first in range(0, len(self.index), chunk_hands):
+            entries = self.index[first:first + chunk_hands]
+            begin = int(entries["start"][0])
+            end = int(entries["start"][-1] + entries["count"][-1])
+            events = np.asarray(self.events[begin:end])
+            owner = np.repeat(np.arange(len(entries)), entries["count"].astype(np.intp))
+            kinds = events["kind"]
+
+            offsets = (entries["start"] - begin).astype(np.intp)
+
+            def so_far(flags):
+                """Running count of flagged events within each hand, up to and including each event."""
+                total = np.cumsum(flags)
+                return total - np.concatenate([[0], total])[offsets][owner]
+
+            players = np.bincount(owner[kinds == PLAYER], minlength=len(entries))
+            aborted = np.bincount(owner[kinds == ABORTED], minlength=len(entries)) > 0
+            holes = np.full((len(entries), 2), -1, dtype=np.intp)
+            hero = np.full(len(entries), 255)
+            hole_events = np.flatnonzero(kinds == HOLE)
+            holes[owner[hole_events]] = events["cards"][hole_events, :2]
+            hero[owner[hole_events]] = events["seat"][hole_events]
+            folds = kinds == FOLD
+            hero_folded = so_far(folds & (events["seat"] == hero[owner]))
+
+            decision = (((kinds == HOLE) | (kinds == BOARD)) & (holes[owner, 0] >= 0) & (hero_folded == 0)
+                        & ~aborted[owner])
+            positions = np.flatnonzero(decision)
+            board_size = np.where(kinds[positions] == HOLE, 0, (events["cards"][positions] >= 0).sum(axis=1))
+            opponents = players[owner[positions]] - so_far(folds)[positions] - 1
+            for size in np.unique(board_size):
+                for count in np.unique(opponents[board_size == size]):
+                    if count < 1:
+                        continue
+                    chosen = positions[(board_size == size) & (opponents == count)]
+                    yield (events["session"][chosen], events["hand"][chosen], events["round"][chosen],
+                           int(count), holes[owner[chosen]], events["cards"][chosen, :size].astype(np.intp))
+
+    def recompute_equities(self, engine, num_trials=1000, chunk_hands=100000):
+        """Re-estimate the main player's win probability at every recorded decision point."""
+        results = []
+        for sessions, hands, rounds, opponents, holes, boards in self.spots(chunk_hands):
+            spot = np.zeros(len(sessions), dtype=SPOT_DTYPE)
+            spot["session"], spot["hand"], spot["round"], spot["opponents"] = sessions, hands, rounds, opponents
+            spot["equity"] = engine.spot_win_probabilities(holes, boards, opponents, num_trials)
+            results.append(spot)
+        if not results:
+            return np.zeros(0, dtype=SPOT_DTYPE)
+        spots = np.concatenate(results)
+        return spots[np.lexsort((spots["round"], spots["hand"], spots["session"]))]
+
+
+def main():
+    from equity import BatchEquityEngine
+
+    parser = argparse.ArgumentParser(description="Summarise a hand-history log and recompute its equities.")
+    parser.add_argument("log")
+    parser.add_argument("--trials", type=int, default=1000, help="Monte Carlo trials per decision point.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the recomputed equities to this CSV file.")
+    args = parser.parse_args()
+
+    reader = HandHistoryReader(args.log)
+    print(f"{len(reader)} hands, {len(reader.events)} events in {len(reader.sessions)} sessions")
+    spots = reader.recompute_equities(BatchEquityEngine(seed=args.seed), args.trials)
+    print(f"Recomputed {len(spots)} decision points")
+    if args.output:
+        np.savetxt(args.output, np.column_stack([spots[name] for name in SPOT_DTYPE.names]), delimiter=",",
+                   header=",".join(SPOT_DTYPE.names), comments="", fmt=["%d", "%d", "%d", "%d", "%.6f"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import functools
+import itertools
+import os
+
+import numpy as np
+from treys import Card, Evaluator
+from treys.lookup import LookupTable
+
+
+# Per-rank keys (deuce to ace) whose sums are unique for every multiset of
+# seven ranks with at most four of each, so a rank multiset maps straight to
+# a slot in a dense table.
+RANK_KEYS = np.array([0, 1, 5, 22, 98, 453, 2031, 8698, 22854, 83661, 262349, 636345, 1479181], dtype=np.int32)
+SUIT_BITS = (1, 2, 4, 8)  # treys suit bits for spades, hearts, diamonds, clubs
+WORST_RANK = LookupTable.MAX_HIGH_CARD + 1
+
+# Cards are indexed 0-51 as rank * 4 + suit.
+CARD_RANK = np.arange(52, dtype=np.int8) // 4
+CARD_SUIT = np.arange(52, dtype=np.int8) % 4
+CARD_KEY = RANK_KEYS[CARD_RANK]
+CARD_BIT = (1 << CARD_RANK.astype(np.int32)).astype(np.uint16)
+INDEX_TO_CARD = np.array([Card.new("23456789TJQKA"[r] + "shdc"[s]) for r in range(13) for s in range(4)], dtype=np.int64)
+
+TABLE_DIR = os.path.dirname(os.path.abspath(__file__))
+TABLE_FILES = ("lookup_flush.npy", "lookup_noflush.npy")
+
+_tables = None
+
+
+def card_to_index(card):
+    """Convert a treys card int into its 0-51 index."""
+    return Card.get_rank_int(card) * 4 + SUIT_BITS.index(Card.get_suit_int(card))
+
+
+def cards_to_indexes(cards):
+    """Convert a list of treys card ints into a NumPy index array."""
+    return np.array([card_to_index(card) for card in cards], dtype=np.int8)
+
+
+def build_tables():
+    """Build the flush and non-flush 7-card lookup tables from the treys 5-card tables."""
+    treys_table = LookupTable()
+    primes = Card.PRIMES
+
+    flush = np.full(1 << 13, WORST_RANK, dtype=np.uint16)
+    for mask in range(1 << 13):
+        ranks = [r for r in range(13) if mask >> r & 1]
+        if len(ranks) >= 5:
+            flush[mask] = min(treys_table.flush_lookup[_prime_product(sub, primes)]
+                              for sub in itertools.combinations(ranks, 5))
+
+    # Grow 5-card rank multisets into 6- and 7-card ones, keeping the best
+    # 5-card value seen; the prime product tracks the multiset itself.
+    level = {prime: (rank, _key_of(prime, primes)) for prime, rank in treys_table.unsuited_lookup.items()}
+    for _ in range(2):
+        grown = {}
+        for product, (rank, key) in level.items():
+            for r, prime in enumerate(primes):
+                if product % prime ** 4 == 0:
+                    continue
+                new_product = product * prime
+                current = grown.get(new_product)
+                if current is None or rank < current[0]:
+                    grown[new_product] = (rank, key + int(RANK_KEYS[r]))
+        level = grown
+
+    noflush = np.full(int(RANK_KEYS[-1]) * 4 + int(RANK_KEYS[-2]) * 3 + 1, WORST_RANK, dtype=np.uint16)
+    for rank, key in level.values():
+        noflush[key] = rank
+    return flush, noflush
+
+
+def _prime_product(ranks, primes):
+    product = 1
+    for r in ranks:
+        product *= primes[r]
+    return product
+
+
+def _key_of(product, primes):
+    key = 0
+    for r, prime in enumerate(primes):
+        while product % prime == 0:
+            product //= prime
+            key += int(RANK_KEYS[r])
+    return key
+
+
+def save_array(path, array):
+    """
+    np.save array to path (".npy" appended if missing) under a temporary
+    name and rename it into place, so a process memory-mapping the file
+    never sees half of it.
+    """
+    if not path.endswith(".npy"):
+        path += ".npy"
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        np.save(f, array)
+    os.replace(temporary, path)
+    return path
+
+
+def save_tables(tables, directory=TABLE_DIR):
+    """Write the (flush, noflush) tables to directory, each atomically."""
+    for name, table in zip(TABLE_FILES, tables):
+        save_array(os.path.join(directory, name), table)
+
+
+def load_tables(directory=TABLE_DIR):
+    """Memory-map previously saved tables, or return None when they are missing."""
+    paths = [os.path.join(directory, name) for name in TABLE_FILES]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    return tuple(np.load(path, mmap_mode="r") for path in paths)
+
+
+def get_tables():
+    """
+    Return the shared (flush, noflush) tables.
+
+    They are memory-mapped from TABLE_DIR when saved there, so worker
+    processes share the pages; otherwise they are built once and saved.
+    """
+    global _tables
+    if _tables is None:
+        _tables = load_tables()
+        if _tables is None:
+            _tables = build_tables()
+            try:
+                save_tables(_tables)
+            except OSError:
+                pass  # read-only install, keep the in-memory tables
+    return _tables
+
+
+def evaluate_seven(cards):
+    """Evaluate an (n, 7) array of card indexes, returning treys-compatible ranks."""
+    flush, noflush = get_tables()
+    cards = np.asarray(cards, dtype=np.intp)
+    best = noflush[CARD_KEY[cards].sum(axis=1)]
+    suits = CARD_SUIT[cards]
+    bits = CARD_BIT[cards]
+    for suit in range(4):
+        mask = np.bitwise_or.reduce(np.where(suits == suit, bits, 0), axis=1)
+        best = np.minimum(best, flush[mask])
+    return best
+
+
+def evaluate_with_board(board, hands):
+    """
+    Evaluate many hole-card pairs against their boards in one pass.
+
+    :param board: (n, 5) array of board card indexes.
+    :param hands: (n, m, 2) array of hole card indexes, m players per board.
+    :return: (n, m) array of treys-compatible ranks (lower is better).
+    """
+    flush, noflush = get_tables()
+    board = np.asarray(board, dtype=np.intp)
+    hands = np.asarray(hands, dtype=np.intp)
+    rows = np.arange(len(board))
+
+    board_key = CARD_KEY[board].sum(axis=1)
+    key = board_key[:, None] + CARD_KEY[hands[..., 0]] + CARD_KEY[hands[..., 1]]
+    best = noflush[key]
+
+    # With five board cards only the suit holding three or more of them can
+    # make a flush, so a single suit per board needs checking.
+    board_suits = CARD_SUIT[board]
+    suit_counts = np.stack([(board_suits == suit).sum(axis=1) for suit in range(4)], axis=1)
+    flush_suit = suit_counts.argmax(axis=1)
+    in_suit = board_suits == flush_suit[:, None]
+    board_mask = np.bitwise_or.reduce(np.where(in_suit, CARD_BIT[board], 0), axis=1)
+    possible = suit_counts[rows, flush_suit] >= 3
+    if possible.any():
+        fs = flush_suit[possible, None]
+        mask = board_mask[possible, None].astype(np.uint16)
+        for i in range(2):
+            held = hands[possible, :, i]
+            mask = mask | np.where(CARD_SUIT[held] == fs, CARD_BIT[held], 0).astype(np.uint16)
+        best[possible] = np.minimum(best[possible], flush[mask])
+    return best
+
+
+class LookupEvaluator():
+    """
+    Drop-in replacement for treys Evaluator.evaluate on one hand at a time.
+
+    A 7-card hand is a few dict lookups and two table reads instead of
+    scoring all 21 five-card subsets. Fewer than 7 cards go to treys.
+    """
+
+    def __init__(self):
+        flush, noflush = get_tables()
+        self.flush = memoryview(np.ascontiguousarray(flush))
+        self.noflush = memoryview(np.ascontiguousarray(noflush))
+        cards = [int(card) for card in INDEX_TO_CARD]
+        self.keys = dict(zip(cards, CARD_KEY.tolist()))
+        # One 4-bit counter per suit; a counter reaches 5 exactly when
+        # adding 3 sets its top bit.
+        self.suit_counts = {card: 1 << 4 * int(suit) for card, suit in zip(cards, CARD_SUIT)}
+
+    @functools.cached_property
+    def fallback(self):
+        return Evaluator()
+
+    def evaluate(self, hand, board):
+        """Return the treys rank (1 is a royal flush, 7462 the worst high card) of hand plus board."""
+        cards = hand + board
+        if len(cards) != 7:
+            return self.fallback.evaluate(hand, board)
+        counts = self.suit_counts
+        total = counts[cards[0]] + counts[cards[1]] + counts[cards[2]] + counts[cards[3]] + \
+            counts[cards[4]] + counts[cards[5]] + counts[cards[6]]
+        flushed = (total + 0x3333) & 0x8888
+        if flushed:
+            # Five cards of one suit leave too few for quads or a full house,
+            # so the flush table alone decides the hand.
+            suit_bit = 1 << 12 + flushed.bit_length() // 4 - 1
+            mask = 0
+            for card in cards:
+                if card & suit_bit:
+                    mask |= card >> 16
+            return self.flush[mask]
+        keys = self.keys
+        return self.noflush[keys[cards[0]] + keys[cards[1]] + keys[cards[2]] + keys[cards[3]] +
+                            keys[cards[4]] + keys[cards[5]] + keys[cards[6]]]
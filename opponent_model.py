@@ -0,0 +1,204 @@
+import json
+import os
+from array import array
+
+from treys import Card
+
+# Counter slots of a profile, all decayed together.
+HANDS, VPIP, PFR, AGGRESSIVE, PASSIVE, FACED_BET, FOLDED_TO_BET = range(7)
+NUM_COUNTERS = 7
+
+# Population averages the statistics start from, and how many hands of
+# evidence they are worth, so a few hands do not swing a profile to 0 or 1.
+PRIOR = {"vpip": 0.3, "pfr": 0.15, "aggression": 1.0, "fold_to_bet": 0.5}
+PRIOR_WEIGHT = 10.0
+# Decayed hands an opponent must have been dealt before their range replaces any two cards.
+MIN_HANDS = 20.0
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opponent_profiles.json")
+
+
+class OpponentProfile():
+    """
+    Decayed action counts for one opponent.
+
+    Counts fade by decay per hand, so the statistics describe roughly the
+    last 1 / (1 - decay) hands. Fading is applied lazily when a profile is
+    touched, which keeps every update O(1) however many hands went by.
+    """
+
+    def __init__(self, counters=None, last_hand=0):
+        self.counters = array("d", counters or [0.0] * NUM_COUNTERS)
+        self.last_hand = last_hand
+        self.entered = False  # Put money in voluntarily this hand
+        self.raised = False  # Bet or raised before the flop this hand
+
+    def catch_up(self, hand, decay):
+        if hand != self.last_hand:
+            factor = decay ** (hand - self.last_hand)
+            for i in range(NUM_COUNTERS):
+                self.counters[i] *= factor
+            self.last_hand = hand
+
+    def rate(self, numerator, denominator, prior):
+        return (self.counters[numerator] + PRIOR_WEIGHT * prior) / (self.counters[denominator] + PRIOR_WEIGHT)
+
+    def vpip(self):
+        return self.rate(VPIP, HANDS, PRIOR["vpip"])
+
+    def pfr(self):
+        return min(self.rate(PFR, HANDS, PRIOR["pfr"]), self.vpip())
+
+    def aggression(self):
+        """Aggression factor: bets and raises per call."""
+        return (self.counters[AGGRESSIVE] + PRIOR_WEIGHT * PRIOR["aggression"]) / (self.counters[PASSIVE] + PRIOR_WEIGHT)
+
+    def fold_to_bet(self):
+        return self.rate(FOLDED_TO_BET, FACED_BET, PRIOR["fold_to_bet"])
+
+    def stats(self):
+        return {"hands": self.counters[HANDS], "vpip": self.vpip(), "pfr": self.pfr(),
+                "aggression": self.aggression(), "fold_to_bet": self.fold_to_bet()}
+
+
+class OpponentModel():
+    """
+    Per-opponent VPIP, PFR, aggression factor and fold-to-bet, updated one
+    action at a time, and the hand ranges they imply.
+    """
+
+    def __init__(self, decay=0.999):
+        self.decay = decay
+        self.hand = 0
+        self.profiles = {}
+        self.ranking = None
+
+    def profile(self, name):
+        profile = self.profiles.get(name)
+        if profile is None:
+            profile = self.profiles[name] = OpponentProfile(last_hand=self.hand)
+        profile.catch_up(self.hand, self.decay)
+        return profile
+
+    def start_hand(self, names):
+        """Count a new hand dealt to each of names."""
+        self.hand += 1
+        for name in names:
+            profile = self.profile(name)
+            profile.counters[HANDS] += 1
+            profile.entered = profile.raised = False
+
+    def observe(self, name, action, preflop, facing_bet):
+        """
+        Update a profile with one action.
+
+        :param action: "bet", "raise", "call", "check" or "fold".
+        :param preflop: True before the flop.
+        :param facing_bet: True when the player had a bet to call.
+        """
+        profile = self.profile(name)
+        counters = profile.counters
+        if facing_bet:
+            counters[FACED_BET] += 1
+            if action == "fold":
+                counters[FOLDED_TO_BET] += 1
+        if action in ("bet", "raise"):
+            counters[AGGRESSIVE] += 1
+        elif action == "call":
+            counters[PASSIVE] += 1
+        if preflop and action in ("bet", "raise", "call"):
+            if not profile.entered:
+                profile.entered = True
+                counters[VPIP] += 1
+            if action != "call" and not profile.raised:
+                profile.raised = True
+                counters[PFR] += 1
+
+    def stats(self, name):
+        return self.profile(name).stats()
+
+    def hand_range(self, name, taper=0.1, min_hands=MIN_HANDS):
+        """
+        1326-combo weights for the hands this opponent plays, or None (any two
+        cards) until they have been seen for min_hands hands.
+
+        The strongest VPIP share of combos (PFR share if they raised before
+        the flop this hand) get weight 1, tapering linearly to 0 over the next
+        taper share so that uncertain cut-offs stay soft.
+        """
+        import numpy as np
+        profile = self.profile(name)
+        if profile.counters[HANDS] < min_hands:
+            return None
+        played = profile.pfr() if profile.raised else profile.vpip()
+        percentile = self.combo_percentiles()
+        return np.clip((played + taper - percentile) / taper, 0.0, 1.0)
+
+    def combo_percentiles(self):
+        """Share of combos at least as strong as each of the 1326 combos."""
+        if self.ranking is None:
+            import numpy as np
+            from preflop_table import class_indexes
+            from ranges import COMBOS
+            strength = class_strength()[class_indexes(COMBOS)]
+            order = np.argsort(-strength, kind="stable")
+            self.ranking = np.empty(len(COMBOS))
+            self.ranking[order] = np.arange(1, len(COMBOS) + 1) / len(COMBOS)
+        return self.ranking
+
+    def to_dict(self):
+        return {"decay": self.decay, "hand": self.hand,
+                "profiles": {name: {"counters": list(profile.counters), "last_hand": profile.last_hand}
+                             for name, profile in self.profiles.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        model = cls(data["decay"])
+        model.hand = data["hand"]
+        for name, profile in data["profiles"].items():
+            model.profiles[name] = OpponentProfile(profile["counters"], profile["last_hand"])
+        return model
+
+    def save(self, path=DEFAULT_PATH):
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_PATH, decay=0.999):
+        """Load saved profiles, or start an empty model when there are none yet."""
+        if not os.path.exists(path):
+            return cls(decay)
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def class_strength():
+    """
+    Pre-flop strength of the 169 starting-hand classes.
+
+    Heads-up equity from the pre-flop table when it has been built,
+    otherwise the Chen formula.
+    """
+    import numpy as np
+    import preflop_table
+    table = preflop_table.load_table()
+    if table is not None:
+        return np.asarray(table[:, 0], dtype=np.float64)
+    points = [1, 1.5, 2, 2.5, 3, 3.5, 4, 4.5, 5, 6, 7, 8, 10]  # Deuce to ace
+    strength = np.zeros(preflop_table.NUM_CLASSES)
+    for index in range(preflop_table.NUM_CLASSES):
+        first, second = preflop_table.class_representative(index)
+        high, low = sorted((Card.get_rank_int(first), Card.get_rank_int(second)), reverse=True)
+        if high == low:
+            strength[index] = max(5, 2 * points[high])
+            continue
+        score = points[high]
+        if Card.get_suit_int(first) == Card.get_suit_int(second):
+            score += 2
+        gap = high - low - 1
+        score -= (0, 1, 2, 4, 5)[min(gap, 4)]
+        if gap <= 1 and high < 10:
+            score += 1
+        strength[index] = score
+    return strength
@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from equity import BatchEquityEngine
+from lookup import get_tables
+
+_engine = None
+
+
+def _init_worker():
+    """Build the lookup tables once per worker process."""
+    global _engine
+    get_tables()
+    _engine = BatchEquityEngine()
+
+
+def _count_wins(hole_cards, community_cards, num_opponents, num_trials, seed):
+    return _engine.count_wins(hole_cards, community_cards, num_opponents, num_trials, rng=np.random.default_rng(seed))
+
+
+class ParallelEquity(BatchEquityEngine):
+    """
+    Split Monte Carlo trials across a persistent process pool.
+
+    Each call spawns one child seed per worker from the seed given at
+    construction, so results are bit-identical for the same seed, worker
+    count and sequence of calls.
+    """
+
+    def __init__(self, workers=None, seed=None):
+        super().__init__(seed=seed)
+        self.workers = workers or os.cpu_count() or 1
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.pool = None
+
+    def start(self):
+        """Fork the worker pool; later calls reuse it until close()."""
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_init_worker)
+        return self
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def count_wins(self, hole_cards, community_cards, num_opponents, num_trials, rng=None):
+        """Count outright wins, with trials split evenly over the workers (rng is unused)."""
+        self.start()
+        seeds = self.seed_sequence.spawn(self.workers)
+        shares = [num_trials // self.workers + (i < num_trials % self.workers) for i in range(self.workers)]
+        futures = [self.pool.submit(_count_wins, hole_cards, community_cards, num_opponents, share, seed)
+                   for share, seed in zip(shares, seeds) if share]
+        return sum(future.result() for future in futures)
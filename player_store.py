@@ -0,0 +1,72 @@
+from array import array
+
+
+class PlayerStore():
+    """
+    Columnar player state: one contiguous column each for balances, current
+    bets and folded flags, one row per player, plus a name -> row index.
+
+    The columns are stdlib arrays, so the table works without NumPy; the
+    analytics view them as NumPy arrays without copying.
+    """
+
+    def __init__(self):
+        self.names = []
+        self.rows = {}
+        self.balance = array("d")
+        self.current_bet = array("d")
+        self.folded = array("b")
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name, balance):
+        """Append a player and return its row."""
+        row = len(self.names)
+        self.names.append(name)
+        self.rows.setdefault(name, row)
+        self.balance.append(balance)
+        self.current_bet.append(0)
+        self.folded.append(0)
+        return row
+
+    def row(self, name):
+        """Row of the first player with this name, or None."""
+        return self.rows.get(name)
+
+    def columns(self):
+        """
+        NumPy views of (balance, current_bet, folded); balance and current_bet
+        share memory with the store, so release them before adding players.
+        """
+        import numpy as np
+        count = len(self.names)
+        return (np.frombuffer(self.balance, dtype=np.float64, count=count),
+                np.frombuffer(self.current_bet, dtype=np.float64, count=count),
+                np.frombuffer(self.folded, dtype=np.int8, count=count).astype(bool))
+
+    def analytics(self, main_row, pot, highest_bet, win_probabilities=None):
+        """
+        Stack deviation, call amount, pot odds and bet sizing for every player at once.
+
+        :param main_row: Row whose stack the others are compared with.
+        :param win_probabilities: Per-player array (or one value for all) used
+            for the bet fractions; omitted, only the stack and pot figures are returned.
+        :return: Dict of arrays, one entry per player in row order.
+        """
+        import numpy as np
+        balance, current_bet, folded = self.columns()
+        to_call = np.maximum(highest_bet - current_bet, 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pot_odds = np.where(to_call > 0, to_call / (pot + to_call), 0.0)
+            deviation = balance / balance[main_row]
+        result = {"name": np.array(self.names), "balance": balance.copy(), "current_bet": current_bet.copy(),
+                  "folded": folded, "stack_deviation": deviation, "to_call": to_call, "pot_odds": pot_odds}
+        if win_probabilities is not None:
+            win = np.broadcast_to(np.asarray(win_probabilities, dtype=np.float64), balance.shape)
+            # Vectorized poker_main.bet_fraction.
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fraction = np.where(pot_odds > 0, (pot_odds * win - (1 - win)) / pot_odds, 2 * win - 1)
+            result["bet_fraction"] = fraction
+            result["bet"] = balance * fraction
+        return result
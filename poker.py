@@ -1,13 +1,152 @@
+import functools
+import importlib.util
+import os
+import pickle
+import random
+import sys
+import threading
+from array import array
+
 from treys import Card, Evaluator, Deck
 
+from equity_cache import DEFAULT_CACHE, EquityCache, canonical_key
+from profiling import profiler
+
+# NumPy and the modules built on it (equity, lookup, parallel, preflop_table)
+# are imported on first use, so importing this module stays cheap. Without
+# NumPy the pure Python loop is kept.
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+
+FULL_DECK = Deck.GetFullDeck()
+
+# Pickled treys Evaluator written by save_evaluator_snapshot; loading it
+# skips building the treys lookup tables.
+EVALUATOR_SNAPSHOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "treys_evaluator.pkl")
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared(key, build):
+    """Return the process-wide component stored under key, calling build() the first time it is asked for."""
+    if key not in _shared:
+        with _shared_lock:
+            if key not in _shared:
+                _shared[key] = build()
+    return _shared[key]
+
+
+def treys_evaluator(snapshot=EVALUATOR_SNAPSHOT):
+    """Load a treys Evaluator from the snapshot when one was saved, otherwise build it."""
+    if snapshot and os.path.exists(snapshot):
+        with open(snapshot, "rb") as f:
+            return pickle.load(f)
+    return Evaluator()
+
+
+def save_evaluator_snapshot(path=EVALUATOR_SNAPSHOT):
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(Evaluator(), f, pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+
+
+def _lookup_evaluator():
+    from lookup import LookupEvaluator
+    return LookupEvaluator()
+
+
+def _batch_engine(seed=None):
+    from equity import BatchEquityEngine
+    return BatchEquityEngine(seed=seed)
+
+
+def _parallel_engine(workers=None, seed=None):
+    from parallel import ParallelEquity
+    return ParallelEquity(workers, seed)
+
+
+def _preflop_table():
+    import preflop_table
+    return preflop_table.load_table()
+
 
 class PokerSimulator():
-    def __init__(self):
-        self.evaluator = Evaluator()
+    """
+    Equity calculations for one seat or one caller.
+
+    The evaluator, the equity engine and the pre-flop table are built on
+    first use and shared by every simulator in the process (an unseeded
+    engine included), so creating simulators, players and games is cheap.
+    Assigning any of them replaces it for that simulator only.
+    """
+
+    def __init__(self, backend=None, workers=None, seed=None, evaluator=None):
+        # "lookup" scores 7-card hands from precomputed tables, "treys" uses
+        # treys Evaluator; any object with evaluate(hand, board) also works
+        evaluator = evaluator or ("lookup" if HAVE_NUMPY else "treys")
+        if evaluator not in ("lookup", "treys"):
+            self.evaluator = evaluator
+        self.evaluator_kind = evaluator
+        self.seed = seed
+        self.workers = workers
+        # "numpy" runs the batched equity engine, "parallel" spreads it over a
+        # process pool and "python" keeps the per-trial loop below
+        self.backend = backend or ("numpy" if HAVE_NUMPY else "python")
+        self.equity_session = None  # Samples carried from street to street by print_stage_results
+        self.live_updates = sys.stdout.isatty()  # Refine printed estimates in place as trials come in
         self.hole_cards = []
         self.community_cards=[]
         self.entered_cards = set()  # To keep track of entered cards
 
+    @functools.cached_property
+    def equity_cache(self):
+        """
+        Repeated and suit-isomorphic spots are answered from here; set to None to always simulate.
+
+        Unseeded simulators share DEFAULT_CACHE. A seeded simulator, or one with
+        its own evaluator, keeps a cache of its own so its results depend only
+        on its seed and never on what another simulator computed first.
+        """
+        if self.seed is not None or self.evaluator_kind not in ("lookup", "treys"):
+            return EquityCache()
+        return DEFAULT_CACHE
+
+    @functools.cached_property
+    def rng(self):
+        return random.Random(self.seed)
+
+    @functools.cached_property
+    def evaluator(self):
+        if self.evaluator_kind == "lookup":
+            return shared("lookup_evaluator", _lookup_evaluator)
+        return shared("treys_evaluator", treys_evaluator)
+
+    @functools.cached_property
+    def equity_engine(self):
+        if self.backend == "parallel":
+            if self.seed is not None:
+                return _parallel_engine(self.workers, self.seed)
+            return shared(("parallel_engine", self.workers), lambda: _parallel_engine(self.workers))
+        if self.backend == "numpy":
+            if self.seed is not None:
+                return _batch_engine(self.seed)
+            return shared("batch_engine", _batch_engine)
+        return None
+
+    @functools.cached_property
+    def preflop_table(self):
+        """Built with `python preflop_table.py`; None until then and simulation is used instead."""
+        if not HAVE_NUMPY:
+            return None
+        return shared("preflop_table", _preflop_table)
+
+    def preflop_lookup(self, hole_cards, num_opponents):
+        """Tabulated pre-flop win probability, or None when there is no table or the spot is outside it."""
+        if self.preflop_table is None:
+            return None
+        import preflop_table
+        return preflop_table.lookup(self.preflop_table, hole_cards, num_opponents)
+
     def convert_to_card(self, rank_suit):
         if rank_suit is None:
             return None
@@ -64,73 +203,229 @@ class PokerSimulator():
         river_card = self.prompt_for_card("Enter river card: ")
         community_cards.append(river_card)
 
+    @profiler.profiled("evaluate_preflop_hand_strength")
     def evaluate_preflop_hand_strength(self, hole_cards, num_simulations=100000, num_opponents=None):
-        """Evaluate pre-flop hand strength using Monte Carlo simulation."""
-        wins = 0
-        
-        for _ in range(num_simulations):
-            deck = Deck()
+        """Evaluate pre-flop hand strength from the precomputed table, or by Monte Carlo simulation."""
+        win_probability = self.preflop_lookup(hole_cards, num_opponents)
+        if win_probability is not None:
+            return win_probability
 
-            for card in hole_cards:
-                deck.cards.remove(card)
-            
-            community_cards = [deck.draw(1)[0] for _ in range(5)]
-            
-            opponent_hands = []
-            for _ in range(num_opponents):
-                opponent_hands.append([deck.draw(1)[0], deck.draw(1)[0]])
-            
-            your_score = self.evaluator.evaluate(hole_cards, community_cards)
-            opponent_scores = [self.evaluator.evaluate(hand, community_cards) for hand in opponent_hands]
-            
-            if all(your_score < score for score in opponent_scores):
-                wins += 1
-        
-        win_probability = wins / num_simulations
-        return win_probability
+        if self.equity_cache is not None:
+            key = canonical_key(hole_cards, [], num_opponents, num_simulations)
+            return self.equity_cache.get_or_compute(
+                key, lambda: self._simulate_preflop(hole_cards, num_simulations, num_opponents))
+        return self._simulate_preflop(hole_cards, num_simulations, num_opponents)
+
+    def _simulate_preflop(self, hole_cards, num_simulations, num_opponents):
+        if self.equity_engine is not None:
+            return self.equity_engine.win_probability(hole_cards, [], num_opponents, num_simulations)
+        return self._simulate_loop(hole_cards, [], num_opponents, num_simulations)
 
+    @profiler.profiled("simulate_winning_probability")
     def simulate_winning_probability(self, hole_cards, community_cards, num_opponents=None, num_simulations=100000):
         """Simulate winning probability based on current community cards."""
-        wins = 0
-        
-        for _ in range(num_simulations):
-            deck = Deck()
-            
-            cards_to_remove = [card for card in hole_cards + community_cards if card is not None]
-            for card in cards_to_remove:
-                try:
-                    deck.cards.remove(card)
-                except ValueError:
+        if self.equity_cache is not None:
+            key = canonical_key(hole_cards, community_cards, num_opponents, num_simulations)
+            return self.equity_cache.get_or_compute(
+                key, lambda: self._simulate_stage(hole_cards, community_cards, num_opponents, num_simulations))
+        return self._simulate_stage(hole_cards, community_cards, num_opponents, num_simulations)
+
+    def _simulate_stage(self, hole_cards, community_cards, num_opponents, num_simulations):
+        if self.equity_engine is not None:
+            return self.equity_engine.win_probability(hole_cards, community_cards, num_opponents, num_simulations)
+        return self._simulate_loop(hole_cards, community_cards, num_opponents, num_simulations)
+
+    def _simulate_loop(self, hole_cards, community_cards, num_opponents, num_simulations):
+        """Pure Python Monte Carlo loop that allocates its deck and hands once per call."""
+        with profiler.phase("loop.deck"):
+            known_board = [card for card in community_cards if card is not None]
+            dead = set(hole_cards + known_board)
+            for card in dead:
+                if card not in FULL_DECK:
                     print(f"Card {Card.int_to_pretty_str(card)} not found in deck. It might have been already removed.")
-                    continue
-            
-            remaining_community_cards = community_cards.copy()
-            while len(remaining_community_cards) < 5:
-                remaining_community_cards.append(deck.draw(1)[0])
-            
-            opponent_hands = []
-            for _ in range(num_opponents):
-                opponent_hands.append([deck.draw(1)[0], deck.draw(1)[0]])
-            
-            your_score = self.evaluator.evaluate(hole_cards, remaining_community_cards)
-            opponent_scores = [self.evaluator.evaluate(hand, remaining_community_cards) for hand in opponent_hands]
-            
-            if all(your_score < score for score in opponent_scores):
-                wins += 1
-        
+
+            # Live cards sit in one buffer; each trial shuffles just the cards it
+            # needs into the front of it (partial Fisher-Yates) and copies them
+            # into the reused board and hand lists.
+            live = array("i", [card for card in FULL_DECK if card not in dead])
+        num_live = len(live)
+        missing = 5 - len(known_board)
+        needed = missing + 2 * num_opponents
+        board = known_board + [0] * missing
+        opponent_hands = [[0, 0] for _ in range(num_opponents)]
+        uniform = self.rng.random
+        evaluate = self.evaluator.evaluate
+        if profiler.enabled:
+            # Time spent in loop.trials but not loop.evaluate is drawing.
+            evaluate = profiler.timed("loop.evaluate", evaluate)
+            profiler.count("trials", num_simulations)
+
+        wins = 0
+        with profiler.phase("loop.trials"):
+            for _ in range(num_simulations):
+                for i in range(needed):
+                    j = i + int(uniform() * (num_live - i))
+                    live[i], live[j] = live[j], live[i]
+
+                for i in range(missing):
+                    board[5 - missing + i] = live[i]
+                for i, hand in enumerate(opponent_hands):
+                    hand[0] = live[missing + 2 * i]
+                    hand[1] = live[missing + 2 * i + 1]
+
+                your_score = evaluate(hole_cards, board)
+                if all(your_score < evaluate(hand, board) for hand in opponent_hands):
+                    wins += 1
+
         win_probability = wins / num_simulations
         return win_probability
 
+    def simulate_showdown_odds(self, hole_cards, community_cards, num_opponents, num_simulations=100000):
+        """
+        Win, tie and expected pot share, each opponent's share and the hand category histogram in one pass.
+
+        :return: ShowdownOdds(win, tie, share, opponent_share, categories, trials).
+        """
+        if self.equity_engine is None:
+            raise ValueError("Showdown odds need the numpy or parallel backend.")
+        return self.equity_engine.showdown_odds(hole_cards, community_cards, num_opponents, num_simulations)
+
+    def sweep_bet_sizes(self, hole_cards, community_cards, bet_sizes, opponent_counts, pot_sizes,
+                        num_simulations=20000, risk_aversion=0.0):
+        """
+        EV and variance surface of every bet size, opponent count and pot size from one shared simulation.
+
+        :return: SweepSurface; ev, variance and std_error are indexed [bet, opponents, pot].
+        """
+        if self.equity_engine is None:
+            raise ValueError("Sweeps need the numpy or parallel backend.")
+        return self.equity_engine.sweep(hole_cards, community_cards, bet_sizes, opponent_counts, pot_sizes,
+                                        num_simulations, risk_aversion)
+
+    def simulate_range_probability(self, hole_cards, community_cards, opponent_ranges, num_simulations=100000, share=False):
+        """
+        Simulate winning probability against opponents holding weighted hand ranges.
+
+        :param opponent_ranges: One entry per opponent: a range string such as "QQ+,AKs,AQo",
+            a 1326-combo weight vector, or None for any two cards.
+        :param share: Return the expected pot share, counting split pots, instead of outright wins.
+        """
+        if self.equity_engine is None:
+            raise ValueError("Range equity needs the numpy or parallel backend.")
+        return self.equity_engine.range_win_probability(hole_cards, community_cards, opponent_ranges, num_simulations,
+                                                        share)
+
+    def estimate_winning_probability(self, hole_cards, community_cards, num_opponents, margin=0.01, threshold=None, confidence=0.95):
+        """
+        Simulate only until the winning probability is known to the precision needed.
+
+        :param margin: Stop once the confidence interval is within +/- margin.
+        :param threshold: Decision threshold such as calculate_pot_odds(); stop once the interval clears it.
+        :return: EquityEstimate(probability, low, high, trials).
+        """
+        if self.equity_engine is None:
+            raise ValueError("Adaptive estimation needs the numpy or parallel backend.")
+        return self.equity_engine.adaptive_win_probability(hole_cards, community_cards, num_opponents, margin=margin,
+                                                           threshold=threshold, confidence=confidence)
+
+    def stage_winning_probability(self, hole_cards, community_cards, num_opponents):
+        """Winning probability on this street, reusing the earlier streets' samples of the same hand."""
+        if self.equity_engine is None:
+            return self.simulate_winning_probability(hole_cards, community_cards, num_opponents=num_opponents)
+        session = self.equity_session
+        if session is None or not session.continues(hole_cards, community_cards, num_opponents):
+            from equity import EquitySession
+            session = self.equity_session = EquitySession(hole_cards, num_opponents, engine=self.equity_engine)
+        return session.update(community_cards)
+
+    def stream_winning_probability(self, hole_cards, community_cards, num_opponents, num_simulations=100000, stop=None):
+        """
+        Yield EquityEstimate(probability, low, high, trials) after every batch of trials.
+
+        The first estimate arrives after a small batch and each one after it
+        is tighter. Stop iterating, or set the threading.Event stop, to cancel.
+        """
+        if self.equity_engine is None:
+            raise ValueError("Streaming estimates need the numpy or parallel backend.")
+        return self.equity_engine.iter_win_probability(hole_cards, community_cards, num_opponents, num_simulations,
+                                                       stop=stop)
+
+    def stream_stage_probability(self, hole_cards, community_cards, num_opponents, stop=None):
+        """Streaming stage_winning_probability: starts from the earlier streets' samples, then refines."""
+        if self.equity_engine is None:
+            raise ValueError("Streaming estimates need the numpy or parallel backend.")
+        session = self.equity_session
+        if session is None or not session.continues(hole_cards, community_cards, num_opponents):
+            from equity import EquitySession
+            session = self.equity_session = EquitySession(hole_cards, num_opponents, engine=self.equity_engine)
+        return session.iter_update(community_cards, stop=stop)
+
+    async def astream_winning_probability(self, hole_cards, community_cards, num_opponents, num_simulations=100000):
+        """
+        Async iterator over streaming estimates; batches run in a worker thread.
+
+        Cancelling the consuming task, or leaving the loop, stops the
+        simulation after the batch in progress.
+        """
+        import asyncio
+        stop = threading.Event()
+        estimates = self.stream_winning_probability(hole_cards, community_cards, num_opponents, num_simulations, stop)
+        loop = asyncio.get_running_loop()
+        done = object()
+        try:
+            while True:
+                estimate = await loop.run_in_executor(None, next, estimates, done)
+                if estimate is done:
+                    break
+                yield estimate
+        finally:
+            stop.set()
+
+    def print_live_estimate(self, estimates, label):
+        """
+        Show estimates in place as they refine and return the last probability,
+        or None when the stream ended (e.g. was stopped) before yielding one.
+
+        Ctrl-C stops refining and keeps the estimate shown so far.
+        """
+        estimate = None
+        try:
+            for estimate in estimates:
+                half_width = 100 * (estimate.high - estimate.low) / 2
+                print(f"\r{label}: {100 * estimate.probability:.2f}% +/- {half_width:.2f}% ({estimate.trials} trials)",
+                      end="", flush=True)
+        except KeyboardInterrupt:
+            if estimate is None:
+                raise
+        finally:
+            print()
+        return estimate.probability if estimate is not None else None
+
     def print_preflop_results(self, hole_cards, num_opponents):
         """Print pre-flop evaluation results."""
-        preflop_strength = 100 * self.evaluate_preflop_hand_strength(hole_cards, num_opponents=num_opponents)
+        if self.live_updates and self.equity_engine is not None and \
+                self.preflop_lookup(hole_cards, num_opponents) is None:
+            estimates = self.stream_winning_probability(hole_cards, [], num_opponents)
+            preflop_strength = self.print_live_estimate(estimates, "Estimating pre-flop winning probability")
+        else:
+            preflop_strength = None
+        if preflop_strength is None:
+            preflop_strength = self.evaluate_preflop_hand_strength(hole_cards, num_opponents=num_opponents)
+        preflop_strength *= 100
         favourable = preflop_strength - ((100 - preflop_strength) / num_opponents)
         print(f"Estimated Pre-flop Winning Probability against {num_opponents} opponents: {preflop_strength:.2f}%")
         print(f"The situation is favorable by {favourable:.2f}%.")
 
     def print_stage_results(self, hole_cards, community_cards, num_opponents, stage_name):
         """Print evaluation results after a specific stage (flop, turn, river)."""
-        stage_probability = 100 * self.simulate_winning_probability(hole_cards, community_cards, num_opponents=num_opponents)
+        if self.live_updates and self.equity_engine is not None:
+            estimates = self.stream_stage_probability(hole_cards, community_cards, num_opponents)
+            stage_probability = self.print_live_estimate(estimates, f"Estimating the {stage_name}")
+        else:
+            stage_probability = None
+        if stage_probability is None:
+            stage_probability = self.stage_winning_probability(hole_cards, community_cards, num_opponents)
+        stage_probability *= 100
         favourable = stage_probability - ((100 - stage_probability) / num_opponents)
         print(f"Estimated Winning Probability after the {stage_name} against {num_opponents} opponents: {stage_probability:.2f}%")
         print(f"The situation is favorable by {favourable:.2f}%.")
@@ -1,16 +1,71 @@
+from player_store import PlayerStore
+from equity_cache import save_default_cache
 from poker import PokerSimulator
+from profiling import profiler
+import os
 import random
+import sys
+
+
+def bet_fraction(win_probability, pot_odds):
+    """Fraction of the balance to bet given the win probability and the pot odds."""
+    if pot_odds > 0:
+        return ((pot_odds * win_probability) - (1 - win_probability)) / pot_odds
+    return (win_probability * 2) - 1
+
+
+# Bet sizes swept by print_sweep, as fractions of the main player's balance,
+# and pot sizes as multiples of the current pot.
+SWEEP_BET_FRACTIONS = (0, 0.05, 0.1, 0.25, 0.5, 1)
+SWEEP_POT_MULTIPLES = (0.5, 1, 2)
+
+
+def pot_odds_for(pot, bet_to_call):
+    """Pot odds of calling bet_to_call into pot, 0 when there is nothing to call."""
+    if bet_to_call <= 0:
+        return 0
+    return bet_to_call / (pot + bet_to_call)
+
+
+def _chips(amount):
+    """Chip amounts are stored as floats; whole amounts read back as ints, as they were entered."""
+    return int(amount) if amount.is_integer() else amount
 
 
 # Define the Player class
 class Player(PokerSimulator):
-    def __init__(self, name, balance):
+    def __init__(self, name, balance, store=None):
         super().__init__()
         self.name = name
-        self.balance = balance
-        self.current_bet = 0
-        self.folded = False
+        # Balance, current bet and folded flag live in a row of a PlayerStore
+        # shared by the table; a lone player gets a store of its own
+        self.store = store if store is not None else PlayerStore()
+        self.row = self.store.add(name, balance)
         self.pot_size=None
+
+    @property
+    def balance(self):
+        return _chips(self.store.balance[self.row])
+
+    @balance.setter
+    def balance(self, value):
+        self.store.balance[self.row] = value
+
+    @property
+    def current_bet(self):
+        return _chips(self.store.current_bet[self.row])
+
+    @current_bet.setter
+    def current_bet(self, value):
+        self.store.current_bet[self.row] = value
+
+    @property
+    def folded(self):
+        return bool(self.store.folded[self.row])
+
+    @folded.setter
+    def folded(self, value):
+        self.store.folded[self.row] = bool(value)
         
     def bet(self, amount):
         if amount > self.balance:
@@ -36,7 +91,8 @@ class Player(PokerSimulator):
         Calculate the utility for the player based on current pot size and win probability.
         
         :param pot_size: Total pot size for the current round.
-        :param win_probability: Probability of winning the round.
+        :param win_probability: Probability of winning the round, or better the expected
+            share of the pot (ShowdownOdds.share), which counts split pots.
         :return: Calculated utility value.
         """
         if self.folded:
@@ -53,6 +109,8 @@ class PokerGame(PokerSimulator):
         super().__init__()
        
         self.players = []
+        self.store = PlayerStore()  # Columnar state of everyone seated, in seating order
+        self.seated = []  # Player objects by store row
         self.original_players = []
         self.starting_balance = starting_balance
         self.highest_bet = 0
@@ -67,6 +125,7 @@ class PokerGame(PokerSimulator):
         self.main_player=self.find_player("George")
         self.num_players=0
         self.num_oppnents=0
+        self.opponent_ranges = None  # Optional hand range per opponent, used by calculate_bet_amount
         self.pot_odds = self.calculate_pot_odds(player_name="George")
 
         self.bet=self.calculate_bet_amount()
@@ -74,12 +133,18 @@ class PokerGame(PokerSimulator):
         self.folded_players=[]
         self.regrets = {'bet': 0, 'call': 0, 'fold': 0, 'check': 0, 'raise': 0}
         self.strategy = {'bet': 0, 'call': 0, 'fold': 0, 'check': 0, 'raise': 0}
+        self.solver = None  # CFRSolver loaded by load_solver
+        self.history = None  # HandHistory opened by record_history
+        self.opponent_model = None  # OpponentModel loaded by load_opponent_model
+        self.sweep_mode = os.environ.get("POKER_SWEEP", "") not in ("", "0")  # print_sweep at every decision
         hole_cards=[]
 
 
 
     def add_player(self, name):
-        self.players.append(Player(name, self.starting_balance))
+        player = Player(name, self.starting_balance, self.store)
+        self.seated.append(player)
+        self.players.append(player)
         self.original_players.append(Player(name, self.starting_balance))
     
 
@@ -96,19 +161,23 @@ class PokerGame(PokerSimulator):
             if amount + player.current_bet < self.highest_bet:
                 print(f"{player_name}'s total bet of ${amount + player.current_bet} is less than the current highest bet of ${self.highest_bet}. Bet must be at least ${self.highest_bet - player.current_bet}.")
                 return False
+            facing_bet = self.highest_bet > player.current_bet
+            if amount + player.current_bet == self.highest_bet and facing_bet:
+                self.observe_action(player, "call")
+            else:
+                self.observe_action(player, "raise" if facing_bet else "bet")
             player.bet(amount)
             if player.current_bet > self.highest_bet:
                 self.highest_bet = player.current_bet
+            self.record_event("bet", player_name, amount)
             return True
         else:
             print(f"Player {player_name} not found.")
             return False
 
     def find_player(self, player_name):
-        for player in self.players:
-            if player.name == player_name:
-                return player
-        return None
+        row = self.store.row(player_name)
+        return self.seated[row] if row is not None else None
         
     def resolve_round(self):
 
@@ -117,6 +186,7 @@ class PokerGame(PokerSimulator):
             winning_player = self.players[0]
             print(f"{winning_player.name} wins the round with the total pot of ${self.pot_total:.2f}")
             winning_player.win(self.pot_total)  # Update winning player's balance
+            self.record_event("win", winning_player.name, self.pot_total)
         else:
             # Prompt for the winning player's name and verify it
             winning_player_name = input("Enter the name of the winning player: ").strip()
@@ -124,6 +194,7 @@ class PokerGame(PokerSimulator):
             
             if winning_player:
                 winning_player.win(self.pot_total)  # Update winning player's balance
+                self.record_event("win", winning_player.name, self.pot_total)
                 print(f"{winning_player.name} wins the round with the total pot of ${self.pot_total:.2f}")
             else:
                 print("Winning player not found. No one wins the pot this round.")
@@ -139,6 +210,9 @@ class PokerGame(PokerSimulator):
             self.players.append(player)
         self.folded_players=[]
         self.pot_total = 0
+        if self.history is not None:
+            self.history.end_hand()
+        self.save_opponent_model()
         self.round_reset=True
         print("The pot has been reset for the next round.")
 
@@ -173,6 +247,7 @@ class PokerGame(PokerSimulator):
             print(player.name)
     
     
+    @profiler.profiled("betting_round")
     def betting_round(self):
         print(f"Round {self.round + 1} betting starts:")
         
@@ -210,8 +285,10 @@ class PokerGame(PokerSimulator):
                         acted_players.add(player)
 
                 elif action == "fold":
+                    self.observe_action(player, "fold")
                     player.fold()
                     print(f"{player.name} has folded.")
+                    self.record_event("fold", player.name)
                     acted_players.add(player)
 
                     # Remove the folded player from the list of players
@@ -239,6 +316,7 @@ class PokerGame(PokerSimulator):
                 elif action == "check":
                     if player.current_bet == self.highest_bet or self.highest_bet == 0:
                         acted_players.add(player)  # Allow player to check
+                        self.observe_action(player, "check")
                         print(f"{player.name} has checked.")
                     else:
                         print("You can only check if there has been no bet made in this round or if you are matching the highest bet.")
@@ -279,8 +357,10 @@ class PokerGame(PokerSimulator):
                             acted_players.add(player)
 
                     elif action == "fold":
+                        self.observe_action(player, "fold")
                         player.fold()
                         print(f"{player.name} has folded.")
+                        self.record_event("fold", player.name)
                         acted_players.add(player)
 
                         # Remove the folded player from the list of players
@@ -331,6 +411,7 @@ class PokerGame(PokerSimulator):
 
 
         
+    @profiler.profiled("calculate_bet_amount")
     def calculate_bet_amount(self):
         # Check if main_player is set; if not, skip execution
         if not self.main_player:
@@ -342,20 +423,128 @@ class PokerGame(PokerSimulator):
         community_cards = self.community_cards
         balance = self.main_player.balance
     
-        if self.round == 0:
-            win_probability = self.evaluate_preflop_hand_strength(hole_cards, num_opponents)
-        else: 
-            win_probability = self.simulate_winning_probability(community_cards, hole_cards, num_opponents)
-    
-        if self.pot_odds > 0:
-            bet_amount = ((self.pot_odds * win_probability) - (1 - win_probability)) / self.pot_odds
+        opponent_ranges = self.opponent_ranges or self.modelled_ranges()
+        if opponent_ranges:
+            # Expected pot share, as on the post-flop path below
+            win_probability = self.simulate_range_probability(hole_cards, community_cards, opponent_ranges, share=True)
+        elif self.round == 0:
+            win_probability = self.evaluate_preflop_hand_strength(hole_cards, num_opponents=num_opponents)
+        elif self.equity_engine is not None:
+            # Expected pot share rather than outright wins, so split pots count
+            win_probability = self.simulate_showdown_odds(hole_cards, community_cards, num_opponents).share
         else:
-            bet_amount = ((win_probability * 2) - 1)
-
-        bet = balance * bet_amount
+            win_probability = self.simulate_winning_probability(hole_cards, community_cards, num_opponents)
+    
+        bet = balance * bet_fraction(win_probability, self.pot_odds)
 
         return bet
+    def load_solver(self, path):
+        """Load a strategy checkpoint written by cfr.py."""
+        from cfr import CFRSolver
+        self.solver = CFRSolver.load(path)
+
+    def update_strategy(self, history=()):
+        """
+        Fill self.strategy and self.regrets from the solver for the hole cards and
+        the actions taken so far this street, e.g. ('bet', 'raise').
+        """
+        if self.solver is None or len(self.hole_cards) != 2:
+            return self.strategy
+        for action in self.strategy:
+            self.strategy[action] = 0
+            self.regrets[action] = 0
+        self.strategy.update(self.solver.strategy(history, self.hole_cards))
+        self.regrets.update(self.solver.regrets_for(history, self.hole_cards))
+        return self.strategy
+
+    def record_history(self, path):
+        """Append every hand played from now on to the hand-history log at path, writing each hand as it ends."""
+        from hand_history import HandHistory
+        self.history = HandHistory(path, batch_size=1)
+
+    def start_hand(self):
+        if self.history is not None:
+            self.history.start_hand([(player.name, player.balance) for player in self.players + self.folded_players])
+        if self.opponent_model is not None:
+            self.opponent_model.start_hand([player.name for player in self.players + self.folded_players
+                                            if player is not self.main_player])
+
+    def load_opponent_model(self, path=None):
+        """
+        Track opponents' VPIP, PFR, aggression and fold-to-bet.
+
+        With a path the profiles saved there are loaded and saved back after
+        every hand; without one the model lives in memory only.
+        """
+        from opponent_model import OpponentModel
+        self.opponent_model_path = path
+        self.opponent_model = OpponentModel.load(path) if path else OpponentModel()
+
+    def save_opponent_model(self):
+        if self.opponent_model is not None and self.opponent_model_path:
+            self.opponent_model.save(self.opponent_model_path)
+
+    def observe_action(self, player, action):
+        """Update the opponent model with one action, before it changes the player's bet."""
+        if self.opponent_model is not None and player is not self.main_player:
+            self.opponent_model.observe(player.name, action, self.round == 0, self.highest_bet > player.current_bet)
+
+    def modelled_ranges(self):
+        """
+        Hand ranges of the opponents still in the hand, as the opponent model sees them,
+        or None while no opponent has been seen for enough hands to have one.
+        """
+        if self.opponent_model is None or self.equity_engine is None:
+            return None
+        ranges = [self.opponent_model.hand_range(player.name) for player in self.players
+                  if player is not self.main_player and not player.folded]
+        if all(hand_range is None for hand_range in ranges):
+            return None
+        return ranges
+
+    def print_modelled_equity(self, hole_cards, community_cards):
+        """Print the expected pot share against the modelled opponent ranges, when there are any."""
+        ranges = self.modelled_ranges()
+        if ranges is None:
+            return None
+        share = self.simulate_range_probability(hole_cards, community_cards, ranges, share=True)
+        print(f"Expected pot share against the modelled opponent ranges: {100 * share:.2f}%")
+        return share
+
+    def record_event(self, kind, player_name=None, amount=0, cards=()):
+        """Log one event of the current hand when a history is being recorded."""
+        if self.history is not None and self.history.hand_start is not None:
+            self.history.record(kind, player_name, amount, cards)
+
+    def sweep_decision(self, hole_cards, community_cards, num_opponents, risk_aversion=0.0):
+        """
+        EV/variance surface for the main player's decision: bet sizes from
+        SWEEP_BET_FRACTIONS of the balance, 1 to num_opponents opponents and
+        pots from SWEEP_POT_MULTIPLES of the current pot.
+        """
+        import numpy as np
+        bet_sizes = self.main_player.balance * np.array(SWEEP_BET_FRACTIONS)
+        pot_sizes = np.unique(self.pot_total * np.array(SWEEP_POT_MULTIPLES))
+        return self.sweep_bet_sizes(hole_cards, community_cards, bet_sizes, range(1, max(num_opponents, 1) + 1),
+                                    pot_sizes, risk_aversion=risk_aversion)
+
+    def print_sweep(self, hole_cards, community_cards, num_opponents):
+        if not self.sweep_mode or self.main_player is None or self.equity_engine is None:
+            return None
+        surface = self.sweep_decision(hole_cards, community_cards, num_opponents)
+        for p, pot in enumerate(surface.pot_sizes):
+            print(f"EV +/- standard deviation with a pot of ${pot:.2f}:")
+            print(f"{'bet':>10}" + "".join(f"{f'{k} opp':>20}" for k in surface.opponent_counts))
+            for b, bet in enumerate(surface.bet_sizes):
+                cells = [f"{surface.ev[b, k, p]:.2f} +/- {surface.variance[b, k, p] ** 0.5:.2f}"
+                         for k in range(len(surface.opponent_counts))]
+                print(f"{bet:>10.2f}" + "".join(f"{cell:>20}" for cell in cells))
+            print(f"{'best bet':>10}" + "".join(f"{surface.best_bet[k, p]:>20.2f}" for k in range(len(surface.opponent_counts))))
+        return surface
+
     def print_bet_amount(self):
+        if self.bet is not None:
+            self.record_event("advice", self.main_player.name if self.main_player else None, self.bet)
         print(f"Bet {self.bet}")
                 
     
@@ -367,10 +556,7 @@ class PokerGame(PokerSimulator):
         current_pot = self.pot_total  # Ensure this returns the correct pot size
         bet_to_call = self.highest_bet   # Amount the player needs to call
 
-        if bet_to_call <= 0:
-            return 0  # No need to call, no pot odds to calculate
-
-        pot_odds = bet_to_call / (current_pot + bet_to_call)
+        pot_odds = pot_odds_for(current_pot, bet_to_call)
     
         
         return pot_odds
@@ -380,16 +566,26 @@ class PokerGame(PokerSimulator):
 
 
         
+    def player_analytics(self, win_probabilities=None):
+        """
+        Stack deviation, amount to call, pot odds and (given win probabilities)
+        bet fractions and sizes for every seated player in one vectorized pass.
+
+        :param win_probabilities: One value per seated player, or one for all.
+        :return: Dict of NumPy arrays in seating order, see PlayerStore.analytics.
+        """
+        return self.store.analytics(self.main_player.row, self.pot_total, self.highest_bet, win_probabilities)
+
     def calculate_stack_deviation(self):
 
-        main_player_stack = self.main_player.balance
+        stack_deviation = self.player_analytics()["stack_deviation"]
         
         deviations = {}
 
         for player in self.players:
             if player == self.main_player:
                 continue  # Skip the main player
-            deviation = player.balance / main_player_stack
+            deviation = float(stack_deviation[player.row])
             deviations[player.name] = deviation
             print(f"Main devided by opponents {deviation}")
     
@@ -407,10 +603,23 @@ class PokerGame(PokerSimulator):
 
     
     
-def main():
+def main(history_path=None):
     starting_balance = int(input("Enter the starting balance: "))
     game = PokerGame(starting_balance)
-
+    if os.environ.get("POKER_OPPONENT_PROFILES"):
+        game.load_opponent_model(os.environ["POKER_OPPONENT_PROFILES"])
+    if history_path:
+        game.record_history(history_path)
+    try:
+        play(game)
+    finally:
+        # Interrupted or not, the hands played so far stay in the log
+        if game.history is not None:
+            game.history.close()
+        save_default_cache()
+
+
+def play(game):
     num_players = int(input("Enter the number of players: "))
     dealer=input("Enter the dealers name: ")
     game.add_player(dealer)
@@ -436,25 +645,38 @@ def main():
             game.print_bet_amount()
 
             if round_number == 0:
+                game.start_hand()
                 hole_cards = game.get_hole_cards()
+                game.record_event("hole", game.main_player.name, cards=hole_cards)
                 game.print_preflop_results(hole_cards, num_players - 1)  # Pass num_opponents
+                game.print_modelled_equity(hole_cards, community_cards)
+                game.print_sweep(hole_cards, community_cards, num_players - 1)
                 game.highest_bet=0
                 game.betting_round()
 
             elif round_number == 1:
                 for _ in range(3):
                     community_cards.append(game.convert_to_card(input(f"Enter community card (flop): ")))
+                game.record_event("board", cards=community_cards)
                 game.print_stage_results(hole_cards, community_cards, num_players - 1, "Flop")
+                game.print_modelled_equity(hole_cards, community_cards)
+                game.print_sweep(hole_cards, community_cards, num_players - 1)
                 game.betting_round()
 
             elif round_number == 2:
                 community_cards.append(game.convert_to_card(input("Enter the fourth (turn) community card: ")))
+                game.record_event("board", cards=community_cards)
                 game.print_stage_results(hole_cards, community_cards, num_players - 1, "Turn")
+                game.print_modelled_equity(hole_cards, community_cards)
+                game.print_sweep(hole_cards, community_cards, num_players - 1)
                 game.betting_round()
 
             elif round_number == 3:
                 community_cards.append(game.convert_to_card(input("Enter the fifth (river) community card: ")))
+                game.record_event("board", cards=community_cards)
                 game.print_stage_results(hole_cards, community_cards, num_players - 1, "River")
+                game.print_modelled_equity(hole_cards, community_cards)
+                game.print_sweep(hole_cards, community_cards, num_players - 1)
                 game.betting_round()
 
             # Increment round number after betting is complete
@@ -480,4 +702,4 @@ def main():
             break
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
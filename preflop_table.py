@@ -0,0 +1,94 @@
+import argparse
+import os
+
+import numpy as np
+from treys import Card
+
+from equity import BatchEquityEngine
+from lookup import save_array
+from parallel import ParallelEquity
+
+NUM_CLASSES = 169
+MAX_OPPONENTS = 9
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "preflop_equity.npy")
+
+_loaded = {}
+
+
+def hand_class_index(hole_cards):
+    """
+    Map two hole cards to one of the 169 suit-canonical starting hands.
+
+    Classes live on a 13x13 grid: pairs on the diagonal, suited hands at
+    (high, low) and offsuit hands at (low, high).
+    """
+    high, low = sorted((Card.get_rank_int(card) for card in hole_cards), reverse=True)
+    if Card.get_suit_int(hole_cards[0]) == Card.get_suit_int(hole_cards[1]):
+        return high * 13 + low
+    return low * 13 + high
+
+
+def class_indexes(cards):
+    """Vectorized hand_class_index for an (n, 2) array of 0-51 card indexes."""
+    cards = np.asarray(cards, dtype=np.intp)
+    ranks, suits = cards // 4, cards % 4
+    high, low = ranks.max(axis=1), ranks.min(axis=1)
+    return np.where(suits[:, 0] == suits[:, 1], high * 13 + low, low * 13 + high)
+
+
+def class_representative(index):
+    """Return a pair of treys cards belonging to the given starting-hand class."""
+    row, col = divmod(index, 13)
+    ranks = "23456789TJQKA"
+    if row > col:
+        return [Card.new(ranks[row] + "s"), Card.new(ranks[col] + "s")]
+    return [Card.new(ranks[row] + "s"), Card.new(ranks[col] + "h")]
+
+
+def build_table(num_simulations=100000, seed=0, workers=None):
+    """Simulate the outright win probability of every class against 1-9 opponents."""
+    engine = ParallelEquity(workers, seed) if workers else BatchEquityEngine(seed=seed)
+    table = np.zeros((NUM_CLASSES, MAX_OPPONENTS), dtype=np.float32)
+    for index in range(NUM_CLASSES):
+        hole_cards = class_representative(index)
+        for num_opponents in range(1, MAX_OPPONENTS + 1):
+            table[index, num_opponents - 1] = engine.win_probability(hole_cards, [], num_opponents, num_simulations)
+    if workers:
+        engine.close()
+    return table
+
+
+def load_table(path=DEFAULT_PATH):
+    """Memory-map the table at path, or return None when it has not been built."""
+    if path not in _loaded:
+        if not os.path.exists(path):
+            return None
+        table = np.load(path, mmap_mode="r")
+        if table.shape != (NUM_CLASSES, MAX_OPPONENTS):
+            raise ValueError(f"Preflop table {path} has shape {table.shape}, expected {(NUM_CLASSES, MAX_OPPONENTS)}.")
+        _loaded[path] = table
+    return _loaded[path]
+
+
+def lookup(table, hole_cards, num_opponents):
+    """Return the tabulated win probability, or None when the spot is outside the table."""
+    if table is None or not 1 <= num_opponents <= MAX_OPPONENTS:
+        return None
+    return float(table[hand_class_index(hole_cards), num_opponents - 1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the precomputed pre-flop equity table.")
+    parser.add_argument("--simulations", type=int, default=100000, help="Monte Carlo trials per hand class and opponent count.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="Spread the simulations over this many processes.")
+    parser.add_argument("--output", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    table = build_table(args.simulations, args.seed, args.workers)
+    path = save_array(args.output, table)
+    print(f"Wrote {NUM_CLASSES}x{MAX_OPPONENTS} pre-flop equity table to {path}")
+
+
+if __name__ == "__main__":
+    main()
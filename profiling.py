@@ -0,0 +1,170 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+
+class _Phase():
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.add_time(self.name, self.start, time.perf_counter())
+
+
+class _NoPhase():
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+class Profiler():
+    """
+    Phase timings and counters for the simulator and the betting loop.
+
+    Off by default; set POKER_PROFILE=1 to switch it on for a run, and
+    POKER_PROFILE_OUTPUT to a .json (Chrome trace), .prom (Prometheus text)
+    or any other path (plain report) to export the results at exit. When
+    off, phase() hands back a shared no-op context manager and count()
+    returns straight away.
+    """
+
+    def __init__(self, enabled=False, max_events=100000):
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.events = deque(maxlen=max_events)
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.seconds.clear()
+        self.calls.clear()
+        self.counters.clear()
+        self.events.clear()
+
+    def phase(self, name):
+        """Time a block: `with profiler.phase("equity.draw"): ...`."""
+        if not self.enabled:
+            return _NO_PHASE
+        return _Phase(self, name)
+
+    def add_time(self, name, start, end):
+        self.seconds[name] += end - start
+        self.calls[name] += 1
+        self.events.append((name, start, end, threading.get_ident()))
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] += amount
+
+    def profiled(self, name=None):
+        """Decorator timing every call of a function as one phase."""
+        def decorate(func):
+            label = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.add_time(label, start, time.perf_counter())
+            return wrapper
+        return decorate
+
+    def timed(self, name, func):
+        """
+        Wrap a hot function so each call adds to the phase totals and the
+        evaluations counter, without a trace event per call.
+        """
+        seconds, calls, counters, clock = self.seconds, self.calls, self.counters, time.perf_counter
+
+        def wrapper(*args):
+            start = clock()
+            result = func(*args)
+            seconds[name] += clock() - start
+            calls[name] += 1
+            counters["evaluations"] += 1
+            return result
+        return wrapper
+
+    def report(self):
+        """Per-phase calls, total and mean seconds, plus the counters."""
+        phases = {name: {"calls": self.calls[name], "seconds": seconds, "mean_seconds": seconds / self.calls[name]}
+                  for name, seconds in sorted(self.seconds.items(), key=lambda item: -item[1])}
+        return {"phases": phases, "counters": dict(self.counters)}
+
+    def format_report(self):
+        report = self.report()
+        lines = [f"{'phase':<40}{'calls':>10}{'total s':>12}{'mean ms':>12}"]
+        for name, phase in report["phases"].items():
+            lines.append(f"{name:<40}{phase['calls']:>10}{phase['seconds']:>12.4f}{1000 * phase['mean_seconds']:>12.4f}")
+        for name, value in sorted(report["counters"].items()):
+            lines.append(f"{name:<40}{value:>10}")
+        return "\n".join(lines)
+
+    def prometheus(self):
+        """Prometheus text exposition format."""
+        lines = ["# TYPE poker_phase_seconds_total counter"]
+        lines += [f'poker_phase_seconds_total{{phase="{name}"}} {seconds:.9f}' for name, seconds in sorted(self.seconds.items())]
+        lines.append("# TYPE poker_phase_calls_total counter")
+        lines += [f'poker_phase_calls_total{{phase="{name}"}} {calls}' for name, calls in sorted(self.calls.items())]
+        for name, value in sorted(self.counters.items()):
+            metric = "poker_" + name.replace(".", "_") + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+    def chrome_trace(self):
+        """Trace-event JSON for chrome://tracing or Perfetto, one complete event per timed phase."""
+        pid = os.getpid()
+        events = [{"name": name, "ph": "X", "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6,
+                   "pid": pid, "tid": tid} for name, start, end, tid in self.events]
+        events += [{"name": name, "ph": "C", "ts": (time.perf_counter() - self.origin) * 1e6, "pid": pid,
+                    "args": {name: value}} for name, value in self.counters.items()]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path):
+        """Write the results in the format given by the file extension."""
+        with open(path, "w") as f:
+            if path.endswith(".json"):
+                json.dump(self.chrome_trace(), f)
+            elif path.endswith(".prom"):
+                f.write(self.prometheus())
+            else:
+                f.write(self.format_report() + "\n")
+
+
+profiler = Profiler(os.environ.get("POKER_PROFILE", "") not in ("", "0"))
+
+if profiler.enabled:
+    if os.environ.get("POKER_PROFILE_OUTPUT"):
+        atexit.register(profiler.export, os.environ["POKER_PROFILE_OUTPUT"])
+    else:
+        atexit.register(lambda: print(profiler.format_report(), file=sys.stderr))
@@ -0,0 +1,98 @@
+import itertools
+
+import numpy as np
+
+RANKS = "23456789TJQKA"
+SUITS = "shdc"
+NUM_COMBOS = 1326
+
+# Every two-card combo as a pair of 0-51 card indexes (rank * 4 + suit),
+# plus the reverse map from a pair of cards to its combo index.
+COMBOS = np.array(list(itertools.combinations(range(52), 2)), dtype=np.int8)
+COMBO_INDEX = np.full((52, 52), -1, dtype=np.int16)
+COMBO_INDEX[COMBOS[:, 0], COMBOS[:, 1]] = np.arange(NUM_COMBOS)
+COMBO_INDEX[COMBOS[:, 1], COMBOS[:, 0]] = np.arange(NUM_COMBOS)
+
+
+def _card(text):
+    return RANKS.index(text[0]) * 4 + SUITS.index(text[1])
+
+
+def _hand_combos(high, low, kind):
+    """Combo indexes for ranks high/low; kind is "s", "o" or "" for both."""
+    combos = []
+    for s1 in range(4):
+        for s2 in range(4):
+            if high == low and s2 <= s1:
+                continue
+            if (kind == "s" and s1 != s2) or (kind == "o" and s1 == s2):
+                continue
+            combos.append(COMBO_INDEX[high * 4 + s1, low * 4 + s2])
+    return combos
+
+
+def _parse_hand(text):
+    """Split a hand like "AKs" or "QQ" into (high, low, kind)."""
+    if len(text) not in (2, 3) or text[0] not in RANKS or text[1] not in RANKS or text[2:] not in ("", "s", "o"):
+        raise ValueError(f"Invalid hand in range: {text}.")
+    high, low = sorted((RANKS.index(text[0]), RANKS.index(text[1])), reverse=True)
+    if high == low and text[2:]:
+        raise ValueError(f"Pairs cannot be suited or offsuit: {text}.")
+    return high, low, text[2:]
+
+
+def _token_combos(token):
+    # Explicit combo such as "AsKs"
+    if len(token) == 4 and token[1] in SUITS and token[3] in SUITS:
+        first, second = _card(token[:2]), _card(token[2:])
+        if first == second:
+            raise ValueError(f"Invalid combo in range: {token}.")
+        return [COMBO_INDEX[first, second]]
+
+    if "-" in token:
+        start, end = (_parse_hand(part) for part in token.split("-"))
+        if start[2] != end[2] or (start[0] == start[1]) != (end[0] == end[1]):
+            raise ValueError(f"Invalid span in range: {token}.")
+        if start[0] == start[1]:
+            ranks = range(min(start[0], end[0]), max(start[0], end[0]) + 1)
+            return [c for r in ranks for c in _hand_combos(r, r, "")]
+        if start[0] != end[0]:
+            raise ValueError(f"Spans must keep the high card fixed: {token}.")
+        kickers = range(min(start[1], end[1]), max(start[1], end[1]) + 1)
+        return [c for k in kickers for c in _hand_combos(start[0], k, start[2])]
+
+    plus = token.endswith("+")
+    high, low, kind = _parse_hand(token.rstrip("+"))
+    if not plus:
+        return _hand_combos(high, low, kind)
+    if high == low:
+        return [c for r in range(high, 13) for c in _hand_combos(r, r, "")]
+    return [c for k in range(low, high) for c in _hand_combos(high, k, kind)]
+
+
+def parse_range(text):
+    """
+    Parse a range such as "QQ+,AKs,AQo,T9s:0.5" into a 1326-combo weight vector.
+
+    Supports pairs, suited/offsuit/any hands, "+" and "-" spans, explicit
+    combos like "AsKs", and an optional ":weight" suffix per token.
+    """
+    weights = np.zeros(NUM_COMBOS, dtype=np.float64)
+    for token in text.replace(" ", "").split(","):
+        if not token:
+            continue
+        token, _, weight = token.partition(":")
+        weights[_token_combos(token)] = float(weight) if weight else 1.0
+    return weights
+
+
+def to_weights(hand_range):
+    """Accept a range string, a 1326 weight vector or None (any two cards)."""
+    if hand_range is None:
+        return np.ones(NUM_COMBOS, dtype=np.float64)
+    if isinstance(hand_range, str):
+        return parse_range(hand_range)
+    weights = np.asarray(hand_range, dtype=np.float64)
+    if weights.shape != (NUM_COMBOS,):
+        raise ValueError(f"Range weight vectors must have {NUM_COMBOS} entries, got shape {weights.shape}.")
+    return weights
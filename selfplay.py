@@ -0,0 +1,234 @@
+import argparse
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from equity import BatchEquityEngine
+from lookup import INDEX_TO_CARD, evaluate_with_board
+from poker_main import bet_fraction, pot_odds_for
+import preflop_table
+
+STREETS = ("preflop", "flop", "turn", "river")
+BOARD_SIZES = (0, 3, 4, 5)
+
+# What a policy sees when it is asked to act.
+View = namedtuple("View", ["seat", "street", "hole_cards", "community_cards", "pot", "to_call",
+                           "stack", "num_opponents", "big_blind"])
+
+
+class RandomPolicy():
+    """Folds, calls or raises the big blind at random."""
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, view):
+        choice = self.rng.random()
+        if choice < 0.2 and view.to_call > 0:
+            return "fold", 0
+        if choice < 0.8:
+            return "call", view.to_call
+        return "raise", view.to_call + view.big_blind
+
+
+class CallingStationPolicy():
+    """Never folds, never raises."""
+
+    def __init__(self, seed=None):
+        pass
+
+    def __call__(self, view):
+        return "call", view.to_call
+
+
+class EquityPolicy():
+    """
+    Bets the fraction of its stack that PokerGame.calculate_bet_amount would.
+
+    Equity comes from the pre-flop table when it is built, otherwise from a
+    small simulation (exact on small spots).
+    """
+
+    def __init__(self, num_simulations=2000, seed=None):
+        self.num_simulations = num_simulations
+        self.engine = BatchEquityEngine(batch_size=num_simulations, seed=seed)
+        self.table = preflop_table.load_table()
+
+    def __call__(self, view):
+        win_probability = None
+        if not view.community_cards:
+            win_probability = preflop_table.lookup(self.table, view.hole_cards, view.num_opponents)
+        if win_probability is None:
+            win_probability = self.engine.win_probability(view.hole_cards, view.community_cards,
+                                                          view.num_opponents, self.num_simulations)
+        bet = view.stack * bet_fraction(win_probability, pot_odds_for(view.pot, view.to_call))
+        if bet <= 0:
+            return ("fold", 0) if view.to_call > 0 else ("check", 0)
+        if bet >= view.to_call + view.big_blind:
+            return "raise", int(bet)
+        return "call", view.to_call
+
+
+POLICIES = {"random": RandomPolicy, "call": CallingStationPolicy, "equity": EquityPolicy}
+
+
+class SelfPlayEngine():
+    """
+    Plays complete no-limit hands between policies with no human input.
+
+    Table state lives in small NumPy arrays indexed by seat (stacks, bets,
+    contributions, folded flags) instead of Player objects. Every hand
+    starts each seat at starting_stack and the result is added to a running
+    bankroll, as in a cash game with automatic rebuys.
+    """
+
+    def __init__(self, policies, starting_stack=1000, small_blind=5, big_blind=10, max_raises=4, seed=None):
+        self.policies = list(policies)
+        self.num_seats = len(self.policies)
+        if self.num_seats < 2:
+            raise ValueError("Self-play needs at least two seats.")
+        self.starting_stack = starting_stack
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.max_raises = max_raises
+        self.rng = np.random.default_rng(seed)
+        self.bankroll = np.zeros(self.num_seats)
+        self.dealer = 0
+        self.hands_played = 0
+
+    def play_hand(self):
+        """Play one hand and return each seat's net result."""
+        n = self.num_seats
+        deck = self.rng.permutation(52).astype(np.int8)
+        holes = deck[:2 * n].reshape(n, 2)
+        board = deck[2 * n:2 * n + 5]
+        stacks = np.full(n, self.starting_stack, dtype=np.int64)
+        contributions = np.zeros(n, dtype=np.int64)
+        folded = np.zeros(n, dtype=bool)
+
+        # Heads-up the button posts the small blind and acts first before the
+        # flop, last after it; otherwise the blinds sit left of the button.
+        small_blind_offset = 0 if n == 2 else 1
+        for street, board_size in zip(STREETS, BOARD_SIZES):
+            bets = np.zeros(n, dtype=np.int64)
+            if street == "preflop":
+                for offset, blind in ((small_blind_offset, self.small_blind), (small_blind_offset + 1, self.big_blind)):
+                    seat = (self.dealer + offset) % n
+                    bets[seat] = min(blind, stacks[seat])
+                    stacks[seat] -= bets[seat]
+                first = (self.dealer + small_blind_offset + 2) % n
+            else:
+                first = (self.dealer + 1) % n
+            self.betting_round(street, board[:board_size], holes, stacks, bets, contributions, folded, first)
+            contributions += bets
+            if (~folded).sum() == 1:
+                break
+
+        payouts = self.showdown(holes, board, contributions, folded)
+        result = payouts - contributions
+        self.bankroll += result
+        self.dealer = (self.dealer + 1) % n
+        self.hands_played += 1
+        return result
+
+    def betting_round(self, street, board, holes, stacks, bets, contributions, folded, first):
+        n = self.num_seats
+        community_cards = [int(card) for card in INDEX_TO_CARD[board]]
+        pending = deque(seat % n for seat in range(first, first + n) if not folded[seat % n] and stacks[seat % n] > 0)
+        raises = 0
+        while pending and (~folded).sum() > 1:
+            seat = pending.popleft()
+            highest = bets.max()
+            to_call = int(min(highest - bets[seat], stacks[seat]))
+            view = View(seat, street, [int(card) for card in INDEX_TO_CARD[holes[seat]]], community_cards,
+                        int(contributions.sum() + bets.sum()), to_call, int(stacks[seat]),
+                        int((~folded).sum() - 1), self.big_blind)
+            action, amount = self.policies[seat](view)
+
+            if action == "fold" and to_call > 0:
+                folded[seat] = True
+                continue
+            if action in ("bet", "raise") and raises < self.max_raises and amount >= to_call + self.big_blind:
+                put = int(min(amount, stacks[seat]))
+            else:
+                put = to_call
+            bets[seat] += put
+            stacks[seat] -= put
+            if bets[seat] > highest:
+                raises += 1
+                # Everyone else still in with chips behind has to act again.
+                pending = deque(other % n for other in range(seat + 1, seat + n)
+                                if not folded[other % n] and stacks[other % n] > 0)
+
+    def showdown(self, holes, board, contributions, folded):
+        """Split the pot, including side pots, among the best hands still in."""
+        payouts = np.zeros(self.num_seats, dtype=np.float64)
+        live = np.flatnonzero(~folded)
+        if len(live) == 1:
+            payouts[live[0]] = contributions.sum()
+            return payouts
+
+        scores = np.full(self.num_seats, np.iinfo(np.int32).max, dtype=np.int64)
+        scores[live] = evaluate_with_board(board[None, :], holes[live][None, :, :])[0]
+        previous = 0
+        for level in np.unique(contributions[live]):
+            pot = (np.minimum(contributions, level) - np.minimum(contributions, previous)).sum()
+            eligible = live[contributions[live] >= level]
+            best = eligible[scores[eligible] == scores[eligible].min()]
+            payouts[best] += pot / len(best)
+            previous = level
+        # Chips above the largest live contribution go back to whoever put them in.
+        payouts += np.maximum(contributions - previous, 0)
+        return payouts
+
+    def play(self, num_hands):
+        """Play num_hands hands, returning (bankroll, hands_per_second)."""
+        start = time.perf_counter()
+        for _ in range(num_hands):
+            self.play_hand()
+        elapsed = time.perf_counter() - start
+        return self.bankroll.copy(), num_hands / elapsed if elapsed else float("inf")
+
+
+def _play_chunk(policy_names, num_hands, seed, settings):
+    seeds = np.random.SeedSequence(seed).spawn(len(policy_names) + 1)
+    policies = [POLICIES[name](seed=child) for name, child in zip(policy_names, seeds[1:])]
+    engine = SelfPlayEngine(policies, seed=seeds[0], **settings)
+    return engine.play(num_hands)[0]
+
+
+def play_parallel(policy_names, num_hands, workers=None, seed=0, **settings):
+    """Play num_hands spread over a process pool, returning (bankroll, hands_per_second)."""
+    workers = workers or 1
+    shares = [num_hands // workers + (i < num_hands % workers) for i in range(workers)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_play_chunk, policy_names, share, [seed, i], settings)
+                   for i, share in enumerate(shares) if share]
+        bankroll = sum(future.result() for future in futures)
+    return bankroll, num_hands / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play hands between bot policies and report results.")
+    parser.add_argument("--policies", default="equity,call,random", help="Comma-separated seats from: " + ", ".join(POLICIES))
+    parser.add_argument("--hands", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--stack", type=int, default=1000)
+    parser.add_argument("--blinds", default="5/10", help="Small and big blind, e.g. 5/10.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    policy_names = args.policies.split(",")
+    small_blind, big_blind = (int(part) for part in args.blinds.split("/"))
+    bankroll, rate = play_parallel(policy_names, args.hands, args.workers, args.seed, starting_stack=args.stack,
+                                   small_blind=small_blind, big_blind=big_blind)
+    print(f"Played {args.hands} hands at {rate:.0f} hands/second.")
+    for seat, (name, total) in enumerate(zip(policy_names, bankroll)):
+        print(f"Seat {seat} ({name}): {total:+.2f} total, {100 * total / args.hands / big_blind:+.2f} bb/100")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+import io
+import json
+
+from batch_analysis import run
+
+
+def analyse(records, workers):
+    output = io.StringIO()
+    run(iter(records), output, workers=workers, simulations=2000, seed=7, window=4)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_results_do_not_depend_on_worker_count():
+    spot = {"hole": "AsKd", "board": "2c7d9h", "opponents": 3}
+    records = [dict(spot, id=i) for i in range(6)]
+    single = analyse(records, 1)
+    assert len({result["equity"] for result in single}) > 1  # Each record gets its own seed
+    assert analyse(records, 3) == single
@@ -0,0 +1,42 @@
+import itertools
+
+import numpy as np
+from treys import Card
+
+from equity import BatchEquityEngine
+from lookup import cards_to_indexes, evaluate_with_board
+from ranges import COMBOS, parse_range
+
+
+def cards(text):
+    return [Card.new(card) for card in text.split()]
+
+
+def exact_range_win_probability(hole_cards, board_cards, range_texts):
+    """Enumerate every disjoint deal of the ranges on a complete board, weighting by the combo weights."""
+    hole, board = cards_to_indexes(hole_cards), cards_to_indexes(board_cards)
+    dead = set(hole.tolist()) | set(board.tolist())
+    ranges = []
+    for text in range_texts:
+        weights = parse_range(text)
+        ranges.append([(tuple(COMBOS[i].tolist()), weights[i]) for i in np.flatnonzero(weights)
+                       if not dead & set(COMBOS[i].tolist())])
+    won = total = 0.0
+    for deal in itertools.product(*ranges):
+        dealt = [card for combo, _ in deal for card in combo]
+        if len(set(dealt)) != len(dealt):
+            continue
+        weight = np.prod([weight for _, weight in deal])
+        hands = np.array([[hole.tolist()] + [list(combo) for combo, _ in deal]], dtype=np.intp)
+        scores = evaluate_with_board(board[None, :].astype(np.intp), hands)[0]
+        won += weight * (scores[0] < scores[1:]).all()
+        total += weight
+    return won / total
+
+
+def test_overlapping_ranges_match_enumeration():
+    hole, board = cards("Qs Qh"), cards("2c 7d 9h 4s 3c")
+    ranges = ["KK,JJ", "KK,AKo"]
+    exact = exact_range_win_probability(hole, board, ranges)
+    estimate = BatchEquityEngine(seed=0).range_win_probability(hole, board, ranges, 200000)
+    assert abs(estimate - exact) < 0.01
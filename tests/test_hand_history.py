@@ -0,0 +1,33 @@
+from treys import Card
+
+from hand_history import HandHistory, HandHistoryReader
+
+
+def play_hand(history, win):
+    history.start_hand([("alice", 100.0), ("bob", 100.0)])
+    history.record("hole", "alice", cards=[Card.new("As"), Card.new("Kd")])
+    history.record("bet", "alice", 10.0)
+    history.record("board", cards=[Card.new("2c"), Card.new("7d"), Card.new("9h")])
+    if win:
+        history.record("win", "alice", 20.0)
+        history.end_hand()
+
+
+def test_interrupted_hand_is_marked_aborted(tmp_path):
+    path = str(tmp_path / "history.log")
+    with HandHistory(path) as history:
+        play_hand(history, win=True)
+        play_hand(history, win=False)
+    reader = HandHistoryReader(path)
+    assert len(reader) == 2
+    assert not reader.aborted(0, 0) and reader.aborted(0, 1)
+    assert reader.replay(0, 0).find_player("alice").balance == 110.0
+    assert reader.replay(0, 1, upto=5).pot_total == 10.0
+    try:
+        reader.replay(0, 1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("replaying an aborted hand to the end should fail")
+    hands = [hand for _, hands, *_ in reader.spots() for hand in hands]
+    assert sorted(set(hands)) == [0]
@@ -0,0 +1,19 @@
+from treys import Card
+
+from poker_main import PokerGame, bet_fraction
+
+
+def test_preflop_bet_amount_uses_opponent_count():
+    game = PokerGame(1000)
+    for name in ("Dealer", "George", "Other"):
+        game.add_player(name)
+    game.main_player = game.find_player("George")
+    game.num_players = 3
+    game.round = 0
+    game.pot_odds = 0
+    game.hole_cards = [Card.new("As"), Card.new("Ad")]
+    game.community_cards = []
+
+    win_probability = game.evaluate_preflop_hand_strength(game.hole_cards, num_opponents=2)
+    assert 0.6 < win_probability < 0.8
+    assert game.calculate_bet_amount() == 1000 * bet_fraction(win_probability, 0)